@@ -0,0 +1,377 @@
+# =============================================================================
+# Модуль: Library/anomaly_store.py
+#
+# Описание:
+# Этот модуль реализует хранилище найденных аномалий, разбитое на сегменты.
+# Каждый сегмент - это CSV-файл аномалий за одни сутки (столбцы прежнего
+# anomaly_log.csv плюс детектор, сработавшие окна и охват движения рынка)
+# и небольшой индекс рядом с ним: сколько аномалий каждого символа
+# в сегменте и за какой промежуток времени.
+#
+# По индексам запрос query_anomalies(symbol=..., start=..., end=...) читает
+# только те сегменты, где есть нужный символ в нужном диапазоне времени,
+# а несколько последних прочитанных сегментов кэшируются в памяти. Строки,
+# дописанные в закэшированный сегмент, добавляются к кэшу без повторного
+# чтения файла.
+#
+# =============================================================================
+
+import io
+import os
+import json
+import threading
+from collections import OrderedDict
+from datetime import date, datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+# --- КОНСТАНТЫ ---
+LOG_COLUMNS = ['timestamp', 'symbol', 'price', 'mean', 'deviation', 'lower_bound', 'upper_bound']
+# Необязательные поля аномалий: детектор, сработавшие окна ('5,20') и охват движения рынка
+EXTRA_COLUMNS = ['detector', 'windows', 'breadth']
+STORE_COLUMNS = LOG_COLUMNS + EXTRA_COLUMNS
+TIMESTAMP_FORMAT = '%Y-%m-%d %H:%M:%S'
+SEGMENT_PREFIX = 'anomalies_'
+SEGMENT_SUFFIX = '.csv'
+INDEX_SUFFIX = '.index.json'
+# Сколько прочитанных сегментов держать в памяти. Ограничение нужно, чтобы
+# прокрутка лога по месяцам истории не загружала в память все сегменты
+CACHED_SEGMENTS = 4
+# Сколько порций дописанных строк копить у закэшированного сегмента до слияния с ним
+MAX_APPENDED_FRAMES = 64
+
+
+def _format_timestamp(value, end_of_day=False):
+    """
+    Приводит datetime, pandas.Timestamp или строку к строке TIMESTAMP_FORMAT (или None).
+
+    При end_of_day=True дата без времени ('2025-06-30' или date) означает
+    конец этих суток, чтобы конец диапазона включал весь последний день.
+    """
+    if value is None:
+        return None
+    timestamp = pd.Timestamp(value)
+    date_only = (isinstance(value, str) and ':' not in value) or \
+        (isinstance(value, date) and not isinstance(value, datetime))
+    if end_of_day and date_only:
+        timestamp = timestamp.normalize() + pd.Timedelta(days=1) - pd.Timedelta(seconds=1)
+    return timestamp.strftime(TIMESTAMP_FORMAT)
+
+
+class AnomalyStore:
+    """
+    Сегментированное хранилище аномалий с индексом по символам и времени.
+
+    Сегменты ротируются по дням: аномалии записываются в файл текущих суток,
+    а сегменты старше retention_days удаляются (0 - хранить все).
+    Временные метки хранятся строками 'YYYY-MM-DD HH:MM:SS', поэтому
+    их лексикографический порядок совпадает с хронологическим.
+    """
+
+    def __init__(self, store_dir, retention_days=0):
+        """
+        Args:
+            store_dir (str): Папка с сегментами хранилища (создается при необходимости).
+            retention_days (int): Сколько суток хранить сегменты (0 - без ограничения).
+        """
+        self.store_dir = store_dir
+        self.retention_days = retention_days
+        self._lock = threading.RLock()
+        # segment -> (stat, df, rows_by_symbol, дописанные строки), от давно прочитанных к недавним
+        self._cache = OrderedDict()
+        os.makedirs(store_dir, exist_ok=True)
+
+        # Индексы всех сегментов держим в памяти: они малы и нужны для каждого запроса
+        self._indexes = {}
+        for filename in sorted(os.listdir(store_dir)):
+            if filename.startswith(SEGMENT_PREFIX) and filename.endswith(INDEX_SUFFIX):
+                with open(os.path.join(store_dir, filename), encoding='utf-8') as f:
+                    index = json.load(f)
+                self._indexes[index['segment']] = index
+        self._apply_retention()
+
+    # --- Служебные методы ---
+
+    def _segment_path(self, segment):
+        return os.path.join(self.store_dir, segment + SEGMENT_SUFFIX)
+
+    def _save_index(self, segment):
+        """Атомарно записывает индекс сегмента на диск."""
+        index_path = os.path.join(self.store_dir, segment + INDEX_SUFFIX)
+        temp_path = index_path + '.tmp'
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(self._indexes[segment], f, ensure_ascii=False)
+        os.replace(temp_path, index_path)
+
+    def _apply_retention(self):
+        """Удаляет сегменты старше retention_days."""
+        if not self.retention_days:
+            return
+        oldest_kept = SEGMENT_PREFIX + (datetime.now() - timedelta(days=self.retention_days)).strftime('%Y-%m-%d')
+        for segment in [s for s in self._indexes if s < oldest_kept]:
+            for path in (self._segment_path(segment), os.path.join(self.store_dir, segment + INDEX_SUFFIX)):
+                if os.path.exists(path):
+                    os.remove(path)
+            del self._indexes[segment]
+            self._cache.pop(segment, None)
+
+    @staticmethod
+    def _file_stat(path):
+        stat = os.stat(path)
+        return stat.st_mtime_ns, stat.st_size
+
+    def _read_segment(self, segment):
+        """
+        Читает сегмент с диска или из кэша (кэш сбрасывается при изменении файла
+        извне). В кэше остаются CACHED_SEGMENTS последних прочитанных сегментов.
+
+        Returns:
+            tuple: (DataFrame сегмента, словарь {symbol: номера строк символа}).
+        """
+        stat = self._file_stat(self._segment_path(segment))
+        cached = self._cache.get(segment)
+        if cached and cached[0] == stat:
+            self._cache.move_to_end(segment)
+            df, rows_by_symbol, appended = cached[1:]
+            if appended:
+                df, rows_by_symbol = self._extend_rows(df, rows_by_symbol, appended)
+                self._cache[segment] = (stat, df, rows_by_symbol, [])
+            return df, rows_by_symbol
+        df = self._read_csv(self._segment_path(segment))
+        rows_by_symbol = df.groupby('symbol', sort=False).indices
+        self._cache[segment] = (stat, df, rows_by_symbol, [])
+        self._cache.move_to_end(segment)
+        while len(self._cache) > CACHED_SEGMENTS:
+            self._cache.popitem(last=False)
+        return df, rows_by_symbol
+
+    @staticmethod
+    def _extend_rows(df, rows_by_symbol, appended):
+        """Добавляет к прочитанному сегменту дописанные строки и их номера в индекс по символам."""
+        extended_df = pd.concat([df] + appended, ignore_index=True)
+        new_rows = extended_df.iloc[len(df):].groupby('symbol', sort=False).indices
+        rows_by_symbol = dict(rows_by_symbol)
+        for symbol, rows in new_rows.items():
+            rows = rows + len(df)
+            rows_by_symbol[symbol] = np.concatenate([rows_by_symbol[symbol], rows]) if symbol in rows_by_symbol else rows
+        return extended_df, rows_by_symbol
+
+    @staticmethod
+    def _read_csv(path):
+        """Читает CSV аномалий; отсутствующие необязательные поля заполняются NaN."""
+        df = pd.read_csv(path, dtype={'timestamp': str, 'symbol': str, 'detector': str, 'windows': str})
+        if list(df.columns) != STORE_COLUMNS:
+            df = df.reindex(columns=STORE_COLUMNS)
+        return df
+
+    def _select_segments(self, symbol, start, end):
+        """Возвращает сегменты (от новых к старым), которые могут содержать нужные аномалии."""
+        selected = []
+        for segment in sorted(self._indexes, reverse=True):
+            index = self._indexes[segment]
+            scope = index['symbols'].get(symbol) if symbol else index
+            if not scope:
+                continue
+            if (start and scope['end'] < start) or (end and scope['start'] > end):
+                continue
+            inside = (not start or scope['start'] >= start) and (not end or scope['end'] <= end)
+            selected.append((segment, scope['count'], inside))
+        return selected
+
+    # --- Запись ---
+
+    def append_many(self, anomalies, timestamp=None):
+        """
+        Записывает аномалии одного цикла в сегмент текущих суток.
+
+        Args:
+            anomalies (list): Словари аномалий (ключи как в LOG_COLUMNS, кроме timestamp;
+                              ключи EXTRA_COLUMNS необязательны).
+            timestamp (datetime, optional): Время обнаружения. По умолчанию - текущее.
+        """
+        if not anomalies:
+            return
+        timestamp = timestamp or datetime.now()
+        rows = [{'timestamp': timestamp.strftime(TIMESTAMP_FORMAT),
+                 **{c: a[c] for c in LOG_COLUMNS[1:]},
+                 'detector': a.get('detector'),
+                 'windows': ','.join(str(w) for w in a['windows']) if a.get('windows') else None,
+                 'breadth': a.get('breadth')}
+                for a in anomalies]
+        self._write_rows(pd.DataFrame(rows, columns=STORE_COLUMNS))
+
+    def _write_rows(self, rows_df):
+        """Дописывает строки в сегменты по их датам и обновляет индексы."""
+        with self._lock:
+            for day, day_df in rows_df.groupby(rows_df['timestamp'].str[:10], sort=True):
+                segment = SEGMENT_PREFIX + day
+                path = self._segment_path(segment)
+                if os.path.exists(path) and not self._has_store_columns(path):
+                    # Сегмент записан до появления необязательных полей: переписываем его с новыми столбцами
+                    self._read_csv(path).to_csv(path, index=False)
+                cached = self._cache.get(segment)
+                cache_valid = cached is not None and cached[0] == self._file_stat(path)
+                day_df.to_csv(path, mode='a', header=not os.path.exists(path), index=False)
+                if cache_valid:
+                    # Файл сегмента не перечитывается: новые строки разбираются из того же CSV-текста,
+                    # поэтому в кэше они совпадают с прочитанными с диска
+                    written_df = self._read_csv(io.StringIO(day_df.to_csv(index=False)))
+                    df, rows_by_symbol, appended = cached[1], cached[2], cached[3] + [written_df]
+                    if len(appended) >= MAX_APPENDED_FRAMES:
+                        df, rows_by_symbol = self._extend_rows(df, rows_by_symbol, appended)
+                        appended = []
+                    self._cache[segment] = (self._file_stat(path), df, rows_by_symbol, appended)
+
+                index = self._indexes.setdefault(segment, {'segment': segment, 'count': 0, 'symbols': {}})
+                self._merge_scope(index, day_df['timestamp'])
+                for symbol, symbol_df in day_df.groupby('symbol'):
+                    scope = index['symbols'].setdefault(symbol, {'count': 0})
+                    self._merge_scope(scope, symbol_df['timestamp'])
+                self._save_index(segment)
+            self._apply_retention()
+
+    @staticmethod
+    def _has_store_columns(path):
+        with open(path, encoding='utf-8') as f:
+            return f.readline().strip().split(',') == STORE_COLUMNS
+
+    @staticmethod
+    def _merge_scope(scope, timestamps):
+        """Учитывает новые временные метки в счетчике и диапазоне времени записи индекса."""
+        scope['count'] += len(timestamps)
+        scope['start'] = min(scope.get('start', timestamps.min()), timestamps.min())
+        scope['end'] = max(scope.get('end', timestamps.max()), timestamps.max())
+
+    def import_csv(self, csv_path):
+        """
+        Переносит аномалии из CSV-лога прежнего формата (или выгрузки export_csv) в хранилище.
+
+        Returns:
+            int: Количество перенесенных записей.
+        """
+        log_df = self._read_csv(csv_path).sort_values('timestamp', kind='stable')
+        self._write_rows(log_df)
+        return len(log_df)
+
+    # --- Чтение ---
+
+    def count(self, symbol=None):
+        """Количество аномалий в хранилище (всего или по символу) - только по индексам."""
+        with self._lock:
+            return sum(count for _, count, _ in self._select_segments(symbol, None, None))
+
+    def query_anomalies(self, symbol=None, start=None, end=None, offset=0, limit=None):
+        """
+        Возвращает аномалии, отфильтрованные по символу и времени, от новых к старым.
+
+        Сегменты без нужного символа или вне диапазона времени не читаются,
+        а при постраничном запросе (offset/limit) целиком пропускаются
+        и сегменты, которые по индексу полностью попадают в offset.
+
+        Args:
+            symbol (str, optional): Символ (например, 'BTC/USDT'). None - все символы.
+            start (datetime or str, optional): Начало диапазона времени (включительно).
+            end (datetime or str, optional): Конец диапазона времени (включительно;
+                                             дата без времени - до конца этих суток).
+            offset (int): Сколько самых новых подходящих записей пропустить.
+            limit (int, optional): Максимальное количество записей.
+
+        Returns:
+            pandas.DataFrame: Аномалии со столбцами STORE_COLUMNS.
+        """
+        start, end = _format_timestamp(start), _format_timestamp(end, end_of_day=True)
+        frames, taken = [], 0
+        with self._lock:
+            for segment, count, inside in self._select_segments(symbol, start, end):
+                # Если сегмент целиком в диапазоне времени, счетчик индекса точен,
+                # и сегмент, полностью попадающий в offset, можно пропустить не читая
+                if inside and offset >= count:
+                    offset -= count
+                    continue
+
+                df, rows_by_symbol = self._read_segment(segment)
+                matched = df.iloc[rows_by_symbol[symbol]] if symbol else df
+                if not inside:
+                    timestamps = matched['timestamp']
+                    matched = matched[((timestamps >= start) if start else True)
+                                      & ((timestamps <= end) if end else True)]
+                matched = matched.iloc[::-1]
+
+                if offset:
+                    skipped = min(offset, len(matched))
+                    matched, offset = matched.iloc[skipped:], offset - skipped
+                frames.append(matched)
+                taken += len(matched)
+                if limit is not None and taken >= limit:
+                    break
+
+        if not frames:
+            return pd.DataFrame(columns=STORE_COLUMNS)
+        result = pd.concat(frames, ignore_index=True)
+        return result.head(limit) if limit is not None else result
+
+    def export_csv(self, csv_path, symbol=None, start=None, end=None):
+        """
+        Выгружает аномалии в один CSV-файл (в хронологическом порядке): столбцы
+        прежнего anomaly_log.csv, за которыми следуют EXTRA_COLUMNS.
+
+        Returns:
+            int: Количество выгруженных записей.
+        """
+        export_df = self.query_anomalies(symbol=symbol, start=start, end=end).iloc[::-1]
+        export_df.to_csv(csv_path, index=False)
+        return len(export_df)
+
+
+def query_anomalies(store_dir, symbol=None, start=None, end=None, limit=None):
+    """
+    Запрос к хранилищу аномалий для отчетных скриптов.
+
+    Args:
+        store_dir (str): Папка хранилища.
+        symbol, start, end, limit: См. AnomalyStore.query_anomalies.
+
+    Returns:
+        pandas.DataFrame: Аномалии от новых к старым.
+    """
+    return AnomalyStore(store_dir).query_anomalies(symbol=symbol, start=start, end=end, limit=limit)
+
+
+# --- Пример использования (для тестирования модуля) ---
+if __name__ == '__main__':
+    import tempfile
+    import time
+
+    print("--- Тестирование модуля anomaly_store.py ---")
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        store = AnomalyStore(temp_dir)
+
+        # Три месяца аномалий по 50 символам: по 20 циклов в сутки
+        test_symbols = [f"SIM{i + 1:04d}/USDT" for i in range(50)]
+        first_day = datetime(2025, 1, 1)
+        for day in range(90):
+            for cycle in range(20):
+                test_time = first_day + timedelta(days=day, minutes=cycle)
+                store.append_many([
+                    {'symbol': s, 'price': 1.0, 'mean': 1.0, 'deviation': 0.0, 'lower_bound': 0.9, 'upper_bound': 1.1}
+                    for s in test_symbols[cycle::20]
+                ], timestamp=test_time)
+        print(f"Записано аномалий: {store.count()}, из них SIM0001/USDT: {store.count('SIM0001/USDT')}")
+
+        # Повторное открытие читает только индексы
+        store = AnomalyStore(temp_dir)
+        store.query_anomalies(symbol='SIM0001/USDT')
+        start_time = time.perf_counter()
+        result = store.query_anomalies(symbol='SIM0001/USDT', start='2025-02-01', end='2025-02-28')
+        elapsed_ms = 1000 * (time.perf_counter() - start_time)
+        print(f"Аномалий SIM0001/USDT за февраль: {len(result)} (запрос: {elapsed_ms:.1f} мс)")
+        if result['timestamp'].str.startswith('2025-02-28').any():
+            print("УСПЕХ: Дата конца периода без времени включает весь последний день.")
+        else:
+            print("ОШИБКА ТЕСТА: Аномалии последнего дня периода не попали в выборку.")
+
+        page = store.query_anomalies(offset=store.count() - 3, limit=10)
+        print(f"Последняя страница (3 самые старые записи):\n{page}")
+        print(f"Сегментов в кэше после чтения трех месяцев: {len(store._cache)} (не больше {CACHED_SEGMENTS})")
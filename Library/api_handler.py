@@ -8,22 +8,41 @@
 #
 # =============================================================================
 
+import os
+import sys
 import ccxt
 import pandas as pd
 from datetime import datetime
 
+# --- Добавляем путь к корневой директории проекта, чтобы импорты работали ---
+# Это позволяет запускать модуль напрямую (python Library/api_handler.py)
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.append(project_root)
 
-def connect_to_exchange(exchange_name):
+from Library.simulated_exchange import SimulatedExchange, SIMULATED_EXCHANGE_NAME
+
+
+def connect_to_exchange(exchange_name, simulation_settings=None, symbols=None):
     """
     Создает и возвращает объект подключения к указанной бирже.
 
     Args:
-        exchange_name (str): Имя биржи, поддерживаемое ccxt (например, 'binance').
+        exchange_name (str): Имя биржи, поддерживаемое ccxt (например, 'binance'),
+                             или 'simulated' для локальной имитации биржи.
+        simulation_settings (dict, optional): Параметры имитации (секция 'simulation'
+                                              конфигурации). Используются только для 'simulated'.
+        symbols (list, optional): Отслеживаемые символы, которые должны быть на имитируемой бирже.
 
     Returns:
         ccxt.Exchange: Объект биржи для дальнейшей работы.
+        SimulatedExchange: Имитация биржи, если exchange_name == 'simulated'.
         None: Если биржа не поддерживается или произошла ошибка инициализации.
     """
+    if exchange_name == SIMULATED_EXCHANGE_NAME:
+        exchange = SimulatedExchange(simulation_settings, symbols)
+        print(f"Подключение к имитации биржи: {len(exchange.symbols)} символов")
+        return exchange
+
     try:
         exchange_class = getattr(ccxt, exchange_name)
         exchange = exchange_class({
@@ -108,6 +127,28 @@ def fetch_tickers_safely(exchange, symbols):
         return pd.DataFrame(columns=['timestamp', 'symbol', 'price'])
 
 
+def find_unknown_symbols(exchange, symbols):
+    """
+    Возвращает символы, которых нет среди рынков биржи.
+
+    Если список рынков не удалось загрузить (например, нет сети),
+    проверка пропускается и возвращается пустой список.
+
+    Args:
+        exchange (ccxt.Exchange): Активный объект подключения к бирже.
+        symbols (list): Проверяемые символы.
+
+    Returns:
+        list: Символы, отсутствующие на бирже.
+    """
+    try:
+        markets = exchange.load_markets()
+    except (ccxt.NetworkError, ccxt.ExchangeError) as e:
+        print(f"Предупреждение: не удалось загрузить список рынков для проверки символов. {e}")
+        return []
+    return [symbol for symbol in symbols if symbol not in markets]
+
+
 # --- Пример использования (для тестирования модуля) ---
 if __name__ == '__main__':
     print("--- Тестирование модуля api_handler.py ---")
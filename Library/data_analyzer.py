@@ -4,13 +4,19 @@
 # Описание:
 # Этот модуль содержит функции для анализа временных рядов данных о ценах.
 # Основная функция - выявление аномалий на основе метода скользящего среднего
-# и стандартного отклонения. Модуль работает с pandas DataFrame.
+# и стандартного отклонения. Модуль работает с pandas DataFrame, а также
+# с буферами префиксных сумм, позволяющими за один проход проверить цену
+# сразу по нескольким окнам.
 #
 # =============================================================================
 
 import pandas as pd
 import numpy as np
 
+# --- КОНСТАНТЫ ---
+# Сколько последних цен каждого символа хранится в буфере префиксных сумм
+DEFAULT_BUFFER_LENGTH = 1000
+
 
 def find_anomalies(history_df, current_price, symbol, window, threshold):
     """
@@ -77,6 +83,148 @@ def find_anomalies(history_df, current_price, symbol, window, threshold):
     return None
 
 
+class RollingPrefixBuffer:
+    """
+    Буфер последних цен одного символа с накопленными суммами цен и их квадратов.
+
+    Сумма и сумма квадратов любого окна из последних w цен получаются разностью
+    двух элементов префиксных массивов, поэтому среднее и стандартное отклонение
+    для любого набора окон считаются за O(1) на окно без повторного прохода по истории.
+
+    Для численной устойчивости суммы накапливаются по отклонениям от опорной цены
+    (первой цены в буфере), а при заполнении массивов буфер уплотняется:
+    сохраняются последние max_len цен, и префиксные суммы пересчитываются заново.
+    Уплотнение происходит раз в max_len добавлений, то есть стоит O(1) в среднем.
+    """
+
+    def __init__(self, max_len=DEFAULT_BUFFER_LENGTH):
+        """
+        Args:
+            max_len (int): Сколько последних цен хранить (не меньше максимального окна).
+        """
+        self.max_len = max_len
+        self._capacity = 2 * max_len
+        self._values = np.empty(self._capacity)
+        self._prefix_sum = np.zeros(self._capacity + 1)
+        self._prefix_sq = np.zeros(self._capacity + 1)
+        self._count = 0
+        self._offset = None
+
+    def __len__(self):
+        return min(self._count, self.max_len)
+
+    def append(self, price):
+        """Добавляет новую цену в конец буфера."""
+        if self._offset is None:
+            self._offset = price
+        if self._count == self._capacity:
+            self._compact()
+
+        value = price - self._offset
+        self._values[self._count] = value
+        self._prefix_sum[self._count + 1] = self._prefix_sum[self._count] + value
+        self._prefix_sq[self._count + 1] = self._prefix_sq[self._count] + value * value
+        self._count += 1
+
+    def values(self):
+        """Возвращает массив хранимых цен (от старых к новым)."""
+        return self._values[self._count - len(self):self._count] + self._offset
+
+    def _compact(self):
+        """Оставляет последние max_len цен и пересчитывает префиксные суммы от новой опорной цены."""
+        prices = self.values()
+        self._offset = prices[0]
+        self._count = len(prices)
+        self._values[:self._count] = prices - self._offset
+        np.cumsum(self._values[:self._count], out=self._prefix_sum[1:self._count + 1])
+        np.cumsum(self._values[:self._count] ** 2, out=self._prefix_sq[1:self._count + 1])
+
+    def window_stats(self, windows):
+        """
+        Рассчитывает среднее и стандартное отклонение (ddof=1, как в pandas)
+        по последним w ценам для каждого окна w.
+
+        Args:
+            windows (array-like): Размеры окон.
+
+        Returns:
+            tuple: (means, stds) - массивы numpy той же длины, что и windows.
+                   Для окон, на которые пока не хватает данных (или w < 2), значения NaN.
+        """
+        windows = np.asarray(windows, dtype=int)
+        means = np.full(windows.shape, np.nan)
+        stds = np.full(windows.shape, np.nan)
+
+        valid = (windows >= 2) & (windows <= len(self))
+        if not valid.any():
+            return means, stds
+
+        w = windows[valid]
+        end = self._count
+        sums = self._prefix_sum[end] - self._prefix_sum[end - w]
+        squares = self._prefix_sq[end] - self._prefix_sq[end - w]
+        window_means = sums / w
+        variances = (squares - sums * window_means) / (w - 1)
+
+        # Разность больших накопленных сумм дает погрешность округления;
+        # дисперсию в пределах этой погрешности считаем нулевой (все цены равны)
+        rounding_error = 64 * np.finfo(float).eps * (
+            self._prefix_sq[end] + np.abs(self._prefix_sum[end] * window_means)) / (w - 1)
+        variances[variances <= rounding_error] = 0.0
+
+        means[valid] = window_means + self._offset
+        stds[valid] = np.sqrt(variances)
+        return means, stds
+
+
+def find_anomalies_multi(buffer, current_price, symbol, windows, threshold):
+    """
+    Проверяет текущую цену сразу по нескольким окнам скользящего среднего.
+
+    Статистика всех окон берется из префиксных сумм буфера за один проход,
+    поэтому стоимость проверки не зависит от размеров окон. В отличие от
+    find_anomalies, текущая цена еще не должна быть добавлена в буфер: она
+    сравнивается со средним и ст. отклонением предыдущих w цен. Иначе цена
+    входит в собственное окно и отклоняется от его среднего не больше чем на
+    (w-1)/√w ст. отклонения, так что короткие окна (например, 5 при пороге 2.5)
+    не срабатывают никогда.
+
+    Args:
+        buffer (RollingPrefixBuffer): Буфер предыдущих цен символа (без текущей).
+        current_price (float): Текущая цена для проверки.
+        symbol (str): Символ криптовалютной пары (например, 'BTC/USDT').
+        windows (list): Размеры окон (например, [5, 20, 120]).
+        threshold (float): Пороговый множитель для стандартного отклонения.
+
+    Returns:
+        dict or None: Словарь с информацией об аномалии (ключи как в find_anomalies
+                      плюс 'windows' - список сработавших окон). Значения mean и
+                      границы относятся к первому сработавшему окну.
+                      None, если ни одно окно не сработало или данных недостаточно.
+    """
+    means, stds = buffer.window_stats(windows)
+    valid = ~np.isnan(means)
+
+    upper_bounds = means + stds * threshold
+    lower_bounds = means - stds * threshold
+    # При std=0 границы совпадают со средним, и любое отклонение считается аномалией
+    fired = valid & ((current_price < lower_bounds) | (current_price > upper_bounds))
+    if not fired.any():
+        return None
+
+    fired_indices = np.flatnonzero(fired)
+    i = fired_indices[0]
+    return {
+        'symbol': symbol,
+        'price': current_price,
+        'mean': round(float(means[i]), 4),
+        'deviation': round(float(abs(current_price - means[i])), 4),
+        'upper_bound': round(float(upper_bounds[i]), 4),
+        'lower_bound': round(float(lower_bounds[i]), 4),
+        'windows': [int(windows[j]) for j in fired_indices]
+    }
+
+
 # --- Пример использования (для тестирования модуля) ---
 if __name__ == '__main__':
     print("--- Тестирование модуля data_analyzer.py (финальная, корректная версия) ---")
@@ -141,3 +289,36 @@ if __name__ == '__main__':
         print(f"УСПЕХ: Аномалия не определена, так как данных ({test_window - 1}) < окна ({test_window}).")
     else:
         print(f"ОШИБКА ТЕСТА: Найдена аномалия при недостаточном количестве данных.")
+
+    # --- Тест 5: Несколько окон по префиксным суммам ---
+    print("\n--- Тест 5: Несколько окон по префиксным суммам ---")
+    # Длинная спокойная история и медленный дрейф вверх: короткое окно успевает
+    # подстроиться под дрейф, а длинное (120) фиксирует отклонение.
+    test_buffer = RollingPrefixBuffer(max_len=200)
+    drift_prices = [100 + 0.1 * (i % 2) for i in range(150)] + [100 + 0.2 * i for i in range(1, 11)]
+    for drift_price in drift_prices[:-1]:
+        test_buffer.append(drift_price)
+    anomaly = find_anomalies_multi(test_buffer, drift_prices[-1], 'TEST/USD', [5, 20, 120], test_threshold)
+    if anomaly and 120 in anomaly['windows'] and 5 not in anomaly['windows']:
+        print(f"УСПЕХ: Сработали окна {anomaly['windows']}: {anomaly}")
+    else:
+        print(f"ОШИБКА ТЕСТА: Неожиданный результат {anomaly}.")
+    test_buffer.append(drift_prices[-1])
+
+    # Резкий скачок должно поймать и короткое окно (5)
+    spike_buffer = RollingPrefixBuffer(max_len=200)
+    for spike_base in [100 + 0.1 * (i % 3) for i in range(150)]:
+        spike_buffer.append(spike_base)
+    anomaly = find_anomalies_multi(spike_buffer, 103.0, 'TEST/USD', [5, 20, 120], 2.5)
+    if anomaly and 5 in anomaly['windows']:
+        print(f"УСПЕХ: Короткое окно поймало скачок, сработали окна {anomaly['windows']}.")
+    else:
+        print(f"ОШИБКА ТЕСТА: Короткое окно не поймало скачок: {anomaly}.")
+
+    # Статистика из префиксных сумм должна совпадать с pandas
+    expected = pd.Series(drift_prices[-20:])
+    means, stds = test_buffer.window_stats([20])
+    if np.isclose(means[0], expected.mean()) and np.isclose(stds[0], expected.std()):
+        print("УСПЕХ: Среднее и ст. отклонение совпадают с pandas.")
+    else:
+        print(f"ОШИБКА ТЕСТА: {means[0]}, {stds[0]} != {expected.mean()}, {expected.std()}.")
@@ -0,0 +1,603 @@
+# =============================================================================
+# Модуль: Library/detectors.py
+#
+# Описание:
+# Этот модуль содержит подключаемые детекторы аномалий и движок, который
+# распределяет символы между ними согласно config.ini.
+#
+# Все детекторы имеют единый пакетный интерфейс: update(symbols, prices)
+# принимает цены сразу многих символов за один цикл и возвращает список
+# результатов той же длины (словарь аномалии или None). Доступные детекторы:
+#   sma  - скользящее среднее ± k·std по нескольким окнам (префиксные суммы);
+#   ewma - экспоненциально взвешенные среднее и дисперсия, O(1) памяти на символ,
+#          все символы обновляются одной векторной операцией numpy;
+#   mad  - скользящая медиана ± k·MAD, устойчивая к "тяжелым хвостам",
+#          на индексируемом skip-списке (O(log w) на обновление).
+#
+# =============================================================================
+
+import os
+import sys
+import math
+import random
+from collections import deque
+from itertools import islice
+
+import numpy as np
+
+# --- Добавляем путь к корневой директории проекта, чтобы импорты работали ---
+# Это позволяет запускать модуль напрямую (python Library/detectors.py)
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.append(project_root)
+
+from Library.data_analyzer import RollingPrefixBuffer, find_anomalies_multi, DEFAULT_BUFFER_LENGTH
+
+# --- КОНСТАНТЫ ---
+DEFAULT_DETECTOR = 'sma'
+
+# Коэффициент, приводящий MAD к стандартному отклонению нормального распределения,
+# чтобы порог standard_deviation_threshold имел одинаковый смысл для всех детекторов
+MAD_TO_STD = 1.4826
+# То же для среднего абсолютного отклонения (√(π/2)); используется, когда MAD = 0
+MEAN_AD_TO_STD = 1.2533
+
+
+def _build_anomaly(detector_name, symbol, price, mean, upper_bound, lower_bound):
+    """Формирует словарь аномалии в том же формате, что и data_analyzer.find_anomalies."""
+    return {
+        'symbol': symbol,
+        'price': price,
+        'mean': round(float(mean), 4),
+        'deviation': round(float(abs(price - mean)), 4),
+        'upper_bound': round(float(upper_bound), 4),
+        'lower_bound': round(float(lower_bound), 4),
+        'detector': detector_name
+    }
+
+
+# --- Детекторы ---
+
+class BaseDetector:
+    """
+    Базовый класс детектора аномалий для группы символов.
+
+    Наследники реализуют update(symbols, prices), remove_symbol для
+    освобождения состояния символа и при необходимости reconfigure.
+    """
+
+    name = None
+
+    def __init__(self, analysis_settings):
+        """
+        Args:
+            analysis_settings (dict): Секция 'analysis' конфигурации.
+        """
+        self.threshold = analysis_settings['standard_deviation_threshold']
+
+    def reconfigure(self, analysis_settings):
+        """
+        Применяет новые параметры анализа, сохраняя накопленное состояние символов.
+
+        Args:
+            analysis_settings (dict): Новая секция 'analysis' конфигурации.
+        """
+        self.threshold = analysis_settings['standard_deviation_threshold']
+
+    def update(self, symbols, prices):
+        """
+        Проверяет новые цены и добавляет их в состояние детектора.
+
+        Args:
+            symbols (list): Символы (без повторов).
+            prices (list or np.ndarray): Текущие цены символов.
+
+        Returns:
+            list: Для каждого символа словарь с информацией об аномалии или None.
+        """
+        raise NotImplementedError
+
+    def remove_symbol(self, symbol):
+        """Освобождает состояние символа, который больше не отслеживается."""
+        raise NotImplementedError
+
+
+class SmaDetector(BaseDetector):
+    """
+    Скользящее среднее ± threshold·std по нескольким окнам (moving_average_windows).
+
+    Цена сравнивается с окнами предыдущих наблюдений, затем добавляется
+    в буфер (как в детекторах ewma и mad).
+    """
+
+    name = 'sma'
+
+    def __init__(self, analysis_settings):
+        super().__init__(analysis_settings)
+        self.windows = analysis_settings['moving_average_windows']
+        self.buffer_length = max(DEFAULT_BUFFER_LENGTH, max(self.windows))
+        self._buffers = {}
+
+    def update(self, symbols, prices):
+        results = []
+        for symbol, price in zip(symbols, prices):
+            buffer = self._buffers.get(symbol)
+            if buffer is None:
+                buffer = self._buffers[symbol] = RollingPrefixBuffer(self.buffer_length)
+            anomaly = find_anomalies_multi(buffer, price, symbol, self.windows, self.threshold)
+            if anomaly:
+                anomaly['detector'] = self.name
+            buffer.append(price)
+            results.append(anomaly)
+        return results
+
+    def reconfigure(self, analysis_settings):
+        super().reconfigure(analysis_settings)
+        self.windows = analysis_settings['moving_average_windows']
+        buffer_length = max(DEFAULT_BUFFER_LENGTH, max(self.windows))
+        if buffer_length != self.buffer_length:
+            # Буферы пересоздаются из уже накопленных цен, новые окна сразу "прогреты"
+            self.buffer_length = buffer_length
+            for symbol, old_buffer in self._buffers.items():
+                buffer = self._buffers[symbol] = RollingPrefixBuffer(buffer_length)
+                for price in old_buffer.values():
+                    buffer.append(price)
+
+    def remove_symbol(self, symbol):
+        self._buffers.pop(symbol, None)
+
+
+class EwmaDetector(BaseDetector):
+    """
+    Экспоненциально взвешенные среднее и дисперсия с параметром сглаживания
+    alpha = 2 / (ewma_span + 1).
+
+    Состояние символа - три числа (среднее, дисперсия, количество наблюдений),
+    хранящиеся в массивах numpy, поэтому обновление всех символов выполняется
+    векторно. Цена сравнивается с прогнозом по предыдущим наблюдениям, затем
+    учитывается в состоянии. Первые ewma_span наблюдений служат для "прогрева".
+    """
+
+    name = 'ewma'
+
+    def __init__(self, analysis_settings):
+        super().__init__(analysis_settings)
+        self.span = analysis_settings['ewma_span']
+        self.alpha = 2.0 / (self.span + 1)
+        self._index = {}
+        self._symbols = []
+        self._mean = np.zeros(0)
+        self._var = np.zeros(0)
+        self._count = np.zeros(0, dtype=int)
+
+    def _indices(self, symbols):
+        """Возвращает индексы символов в массивах состояния, добавляя новые символы."""
+        new_symbols = [s for s in symbols if s not in self._index]
+        if new_symbols:
+            for symbol in new_symbols:
+                self._index[symbol] = len(self._symbols)
+                self._symbols.append(symbol)
+            self._mean = np.concatenate((self._mean, np.zeros(len(new_symbols))))
+            self._var = np.concatenate((self._var, np.zeros(len(new_symbols))))
+            self._count = np.concatenate((self._count, np.zeros(len(new_symbols), dtype=int)))
+        return np.fromiter((self._index[s] for s in symbols), dtype=int, count=len(symbols))
+
+    def update(self, symbols, prices):
+        idx = self._indices(symbols)
+        prices = np.asarray(prices, dtype=float)
+        mean, var, count = self._mean[idx], self._var[idx], self._count[idx]
+
+        # 1. Проверка по состоянию до учета текущей цены
+        std = np.sqrt(var)
+        upper_bounds = mean + self.threshold * std
+        lower_bounds = mean - self.threshold * std
+        fired = (count >= self.span) & ((prices < lower_bounds) | (prices > upper_bounds))
+
+        # 2. Обновление состояния (первое наблюдение задает начальное среднее)
+        diff = np.where(count == 0, 0.0, prices - mean)
+        increment = self.alpha * diff
+        self._mean[idx] = np.where(count == 0, prices, mean + increment)
+        self._var[idx] = (1 - self.alpha) * (var + diff * increment)
+        self._count[idx] = count + 1
+
+        results = [None] * len(symbols)
+        for i in np.flatnonzero(fired):
+            results[i] = _build_anomaly(self.name, symbols[i], float(prices[i]),
+                                        mean[i], upper_bounds[i], lower_bounds[i])
+        return results
+
+    def reconfigure(self, analysis_settings):
+        # Накопленные среднее и дисперсия остаются оценками и при новом периоде:
+        # дальше они обновляются с новым alpha
+        super().reconfigure(analysis_settings)
+        self.span = analysis_settings['ewma_span']
+        self.alpha = 2.0 / (self.span + 1)
+
+    def remove_symbol(self, symbol):
+        i = self._index.pop(symbol, None)
+        if i is None:
+            return
+        del self._symbols[i]
+        self._mean = np.delete(self._mean, i)
+        self._var = np.delete(self._var, i)
+        self._count = np.delete(self._count, i)
+        self._index = {s: j for j, s in enumerate(self._symbols)}
+
+
+class _SkiplistNode:
+    """Узел индексируемого skip-списка."""
+
+    __slots__ = ('value', 'next', 'width')
+
+    def __init__(self, value, next_nodes, widths):
+        self.value = value
+        self.next = next_nodes
+        self.width = widths
+
+
+_SKIPLIST_END = _SkiplistNode(math.inf, [], [])
+
+
+class IndexableSkiplist:
+    """
+    Отсортированная коллекция чисел с доступом к k-му по величине элементу.
+
+    Каждый уровень хранит "ширину" ссылок (сколько элементов она перепрыгивает),
+    поэтому вставка, удаление и выбор k-го элемента выполняются за O(log n).
+    """
+
+    def __init__(self, expected_size=100):
+        self.size = 0
+        self.max_levels = int(1 + math.log2(max(expected_size, 2)))
+        self.head = _SkiplistNode(None, [_SKIPLIST_END] * self.max_levels, [1] * self.max_levels)
+
+    def __len__(self):
+        return self.size
+
+    def __getitem__(self, i):
+        node = self.head
+        i += 1
+        for level in reversed(range(self.max_levels)):
+            while node.width[level] <= i:
+                i -= node.width[level]
+                node = node.next[level]
+        return node.value
+
+    def insert(self, value):
+        """Вставляет значение с сохранением порядка."""
+        chain = [None] * self.max_levels
+        steps_at_level = [0] * self.max_levels
+        node = self.head
+        for level in reversed(range(self.max_levels)):
+            while node.next[level].value <= value:
+                steps_at_level[level] += node.width[level]
+                node = node.next[level]
+            chain[level] = node
+
+        levels = min(self.max_levels, 1 - int(math.log2(1.0 - random.random())))
+        new_node = _SkiplistNode(value, [None] * levels, [None] * levels)
+        steps = 0
+        for level in range(levels):
+            prev_node = chain[level]
+            new_node.next[level] = prev_node.next[level]
+            prev_node.next[level] = new_node
+            new_node.width[level] = prev_node.width[level] - steps
+            prev_node.width[level] = steps + 1
+            steps += steps_at_level[level]
+        for level in range(levels, self.max_levels):
+            chain[level].width[level] += 1
+        self.size += 1
+
+    def remove(self, value):
+        """Удаляет одно вхождение значения."""
+        chain = [None] * self.max_levels
+        node = self.head
+        for level in reversed(range(self.max_levels)):
+            while node.next[level].value < value:
+                node = node.next[level]
+            chain[level] = node
+        if chain[0].next[0].value != value:
+            raise KeyError(f"Значение {value} отсутствует в skip-списке")
+
+        levels = len(chain[0].next[0].next)
+        for level in range(levels):
+            prev_node = chain[level]
+            prev_node.width[level] += prev_node.next[level].width[level] - 1
+            prev_node.next[level] = prev_node.next[level].next[level]
+        for level in range(levels, self.max_levels):
+            chain[level].width[level] -= 1
+        self.size -= 1
+
+
+class _RollingMedianMad:
+    """Скользящие медиана и MAD последних window цен одного символа."""
+
+    def __init__(self, window, history_length):
+        self.window = window
+        self.values = deque(maxlen=history_length)
+        self.sorted_values = IndexableSkiplist(window)
+
+    def push(self, price):
+        """Добавляет цену в окно, вытесняя самую старую при переполнении."""
+        if len(self.sorted_values) == self.window:
+            self.sorted_values.remove(self.values[-self.window])
+        self.values.append(price)
+        self.sorted_values.insert(price)
+
+    def median(self):
+        n = len(self.sorted_values)
+        if n % 2:
+            return self.sorted_values[n // 2]
+        return (self.sorted_values[n // 2 - 1] + self.sorted_values[n // 2]) / 2
+
+    def _kth_distance(self, k, median):
+        """
+        Возвращает k-е (с нуля) по величине расстояние |x - median|.
+
+        Расстояния до элементов левее медианы (в обратном порядке) и правее нее
+        образуют две возрастающие последовательности; k-й элемент их объединения
+        находится бинарным поиском за O(log w) обращений к skip-списку.
+        """
+        values = self.sorted_values
+        split = len(values) // 2
+        left_size, right_size = split, len(values) - split
+
+        def left(j):
+            return median - values[split - 1 - j]
+
+        def right(j):
+            return values[split + j] - median
+
+        taken = k + 1
+        low, high = max(0, taken - right_size), min(taken, left_size)
+        while low <= high:
+            i = (low + high) // 2
+            j = taken - i
+            if i < left_size and j > 0 and right(j - 1) > left(i):
+                low = i + 1
+            elif i > 0 and j < right_size and left(i - 1) > right(j):
+                high = i - 1
+            else:
+                break
+        candidates = []
+        if i > 0:
+            candidates.append(left(i - 1))
+        if j > 0:
+            candidates.append(right(j - 1))
+        return max(candidates)
+
+    def mad(self, median):
+        n = len(self.sorted_values)
+        if n % 2:
+            return self._kth_distance(n // 2, median)
+        return (self._kth_distance(n // 2 - 1, median) + self._kth_distance(n // 2, median)) / 2
+
+    def mean_absolute_deviation(self, median):
+        """Среднее абсолютное отклонение цен окна от медианы (O(w), только как запасной вариант)."""
+        window_values = islice(reversed(self.values), len(self.sorted_values))
+        return sum(abs(value - median) for value in window_values) / len(self.sorted_values)
+
+
+class MadDetector(BaseDetector):
+    """
+    Скользящая медиана ± threshold·1.4826·MAD по последним mad_window ценам.
+
+    Медиана и MAD почти не реагируют на единичные выбросы, поэтому детектор
+    дает меньше ложных срабатываний на "тяжелых хвостах" криптовалют.
+    Цена сравнивается с окном предыдущих наблюдений, затем добавляется в него.
+
+    Если больше половины цен окна одинаковы (частый случай для спокойных пар
+    с округлением до шага цены), MAD равен 0 и границы схлопываются к медиане.
+    Тогда масштаб берется из среднего абсолютного отклонения от медианы.
+    """
+
+    name = 'mad'
+
+    def __init__(self, analysis_settings):
+        super().__init__(analysis_settings)
+        self.window = analysis_settings['mad_window']
+        self.history_length = max(DEFAULT_BUFFER_LENGTH, self.window)
+        self._states = {}
+
+    def update(self, symbols, prices):
+        results = []
+        for symbol, price in zip(symbols, prices):
+            state = self._states.get(symbol)
+            if state is None:
+                state = self._states[symbol] = _RollingMedianMad(self.window, self.history_length)
+
+            anomaly = None
+            if len(state.sorted_values) == self.window:
+                median = state.median()
+                spread = MAD_TO_STD * state.mad(median)
+                if spread == 0:
+                    spread = MEAN_AD_TO_STD * state.mean_absolute_deviation(median)
+                scale = self.threshold * spread
+                upper_bound, lower_bound = median + scale, median - scale
+                if not (lower_bound <= price <= upper_bound):
+                    anomaly = _build_anomaly(self.name, symbol, price, median, upper_bound, lower_bound)
+            state.push(price)
+            results.append(anomaly)
+        return results
+
+    def reconfigure(self, analysis_settings):
+        super().reconfigure(analysis_settings)
+        window = analysis_settings['mad_window']
+        if window != self.window:
+            # Окна пересобираются из истории цен символа (не меньше DEFAULT_BUFFER_LENGTH)
+            self.window = window
+            self.history_length = max(DEFAULT_BUFFER_LENGTH, window)
+            for symbol, old_state in self._states.items():
+                state = self._states[symbol] = _RollingMedianMad(window, self.history_length)
+                for price in old_state.values:
+                    state.push(price)
+
+    def remove_symbol(self, symbol):
+        self._states.pop(symbol, None)
+
+
+DETECTOR_CLASSES = {cls.name: cls for cls in (SmaDetector, EwmaDetector, MadDetector)}
+
+
+# --- Движок детекторов ---
+
+class DetectorEngine:
+    """
+    Распределяет символы между детекторами и вызывает каждый детектор
+    одним пакетом на цикл обновления.
+
+    Детектор символа берется из секции [Detectors] конфигурации,
+    а при его отсутствии - из параметра detector секции [Analysis].
+    """
+
+    def __init__(self, analysis_settings, detector_overrides=None):
+        """
+        Args:
+            analysis_settings (dict): Секция 'analysis' конфигурации.
+            detector_overrides (dict, optional): Детекторы отдельных символов {symbol: name}.
+
+        Raises:
+            ValueError: Если указан неизвестный детектор.
+        """
+        self._validate(analysis_settings, detector_overrides)
+        self.default_detector = analysis_settings['detector']
+        self.overrides = dict(detector_overrides or {})
+        self.detectors = {name: cls(analysis_settings) for name, cls in DETECTOR_CLASSES.items()}
+        self._assignments = {}
+
+    @staticmethod
+    def _validate(analysis_settings, detector_overrides):
+        for name in [analysis_settings['detector'], *(detector_overrides or {}).values()]:
+            if name not in DETECTOR_CLASSES:
+                raise ValueError(
+                    f"Неизвестный детектор '{name}'. Доступны: {', '.join(DETECTOR_CLASSES)}")
+
+    def reconfigure(self, analysis_settings, detector_overrides=None):
+        """
+        Применяет новые параметры анализа без потери накопленной истории.
+
+        Детекторы перестраивают окна по уже накопленным ценам. Символы, которым
+        назначен другой детектор, освобождаются в прежнем детекторе; их новый
+        детектор можно "прогреть" историей цен через warm_up.
+
+        Args:
+            analysis_settings (dict): Новая секция 'analysis' конфигурации.
+            detector_overrides (dict, optional): Новые детекторы отдельных символов.
+
+        Returns:
+            list: Символы, у которых сменился детектор.
+
+        Raises:
+            ValueError: Если указан неизвестный детектор (состояние не меняется).
+        """
+        self._validate(analysis_settings, detector_overrides)
+        self.default_detector = analysis_settings['detector']
+        self.overrides = dict(detector_overrides or {})
+        for detector in self.detectors.values():
+            detector.reconfigure(analysis_settings)
+
+        reassigned = [symbol for symbol, name in self._assignments.items()
+                      if self.overrides.get(symbol, self.default_detector) != name]
+        for symbol in reassigned:
+            self.remove_symbol(symbol)
+        return reassigned
+
+    def warm_up(self, symbol, prices):
+        """Пропускает историю цен символа через его детектор (найденные аномалии не возвращаются)."""
+        detector = self.detectors[self.detector_name(symbol)]
+        for price in prices:
+            detector.update([symbol], [price])
+
+    def detector_name(self, symbol):
+        """Возвращает имя детектора, назначенного символу."""
+        name = self._assignments.get(symbol)
+        if name is None:
+            name = self._assignments[symbol] = self.overrides.get(symbol, self.default_detector)
+        return name
+
+    def process(self, symbols, prices):
+        """
+        Проверяет цены всех символов за цикл.
+
+        Args:
+            symbols (list): Символы (без повторов).
+            prices (list or np.ndarray): Текущие цены символов.
+
+        Returns:
+            list: Словари с информацией о найденных аномалиях в порядке символов.
+        """
+        groups = {}
+        for position, symbol in enumerate(symbols):
+            groups.setdefault(self.detector_name(symbol), []).append(position)
+
+        results = [None] * len(symbols)
+        for name, positions in groups.items():
+            group_results = self.detectors[name].update(
+                [symbols[p] for p in positions], [prices[p] for p in positions])
+            for position, result in zip(positions, group_results):
+                results[position] = result
+        return [result for result in results if result]
+
+    def remove_symbol(self, symbol):
+        """Освобождает состояние символа во всех детекторах."""
+        name = self._assignments.pop(symbol, None)
+        if name is not None:
+            self.detectors[name].remove_symbol(symbol)
+
+
+# --- Пример использования (для тестирования модуля) ---
+if __name__ == '__main__':
+    print("--- Тестирование модуля detectors.py ---")
+
+    test_settings = {
+        'standard_deviation_threshold': 3.0,
+        'moving_average_windows': [20],
+        'ewma_span': 20,
+        'mad_window': 21
+    }
+
+    # --- Тест 1: Skip-список сохраняет порядок и дает верные медиану и MAD ---
+    rng = np.random.default_rng(1)
+    test_values = rng.standard_t(3, 501)
+    rolling = _RollingMedianMad(window=101, history_length=DEFAULT_BUFFER_LENGTH)
+    for value in test_values:
+        rolling.push(value)
+    window_values = test_values[-101:]
+    expected_median = np.median(window_values)
+    expected_mad = np.median(np.abs(window_values - expected_median))
+    if np.isclose(rolling.median(), expected_median) and np.isclose(rolling.mad(rolling.median()), expected_mad):
+        print("УСПЕХ: Медиана и MAD совпадают с numpy.")
+    else:
+        print(f"ОШИБКА ТЕСТА: {rolling.median()}, {rolling.mad(rolling.median())} "
+              f"!= {expected_median}, {expected_mad}.")
+
+    # --- Тест 2: Все детекторы находят скачок на спокойном фоне ---
+    base_prices = 100 + rng.normal(0, 0.1, 60)
+    for detector_name in DETECTOR_CLASSES:
+        engine = DetectorEngine(dict(test_settings, detector=detector_name))
+        for base_price in base_prices:
+            engine.process(['TEST/USD'], [base_price])
+        anomalies = engine.process(['TEST/USD'], [105.0])
+        if anomalies and anomalies[0]['detector'] == detector_name:
+            print(f"УСПЕХ: Детектор {detector_name} нашел аномалию: {anomalies[0]}")
+        else:
+            print(f"ОШИБКА ТЕСТА: Детектор {detector_name} не нашел аномалию.")
+
+    # --- Тест 3: MAD = 0 на ценах, округленных до шага цены ---
+    engine = DetectorEngine(dict(test_settings, detector='mad'))
+    tick_prices = [100.0] * 12 + [100.01, 99.99] * 4 + [100.0] * 10
+    false_alarms = [engine.process(['TEST/USD'], [p]) for p in tick_prices + [100.01, 99.99]]
+    if not any(false_alarms[len(tick_prices):]) and engine.process(['TEST/USD'], [100.5]):
+        print("УСПЕХ: При MAD = 0 соседние шаги цены не считаются аномалией, скачок найден.")
+    else:
+        print("ОШИБКА ТЕСТА: При MAD = 0 детектор срабатывает на шаг цены или пропускает скачок.")
+
+    # --- Тест 4: Смена окна и порога использует накопленную историю ---
+    engine = DetectorEngine(dict(test_settings, detector='mad'))
+    for base_price in base_prices:
+        engine.process(['TEST/USD'], [base_price])
+    engine.reconfigure(dict(test_settings, detector='mad', mad_window=41, standard_deviation_threshold=5.0))
+    state = engine.detectors['mad']._states['TEST/USD']
+    if len(state.sorted_values) == 41 and engine.process(['TEST/USD'], [105.0]):
+        print("УСПЕХ: Новое окно MAD заполнено из истории, аномалия найдена без повторного прогрева.")
+    else:
+        print("ОШИБКА ТЕСТА: После смены окна детектор MAD потерял историю.")
@@ -0,0 +1,242 @@
+# =============================================================================
+# Модуль: Library/market_analyzer.py
+#
+# Описание:
+# Этот модуль выявляет движения всего рынка. Когда, например, BTC меняется
+# на несколько процентов, аномалии срабатывают сразу по всем символам;
+# модель рыночного фактора распознает такое событие как одно "движение рынка"
+# и оставляет среди аномалий символов только идиосинкратические, то есть
+# не объясняемые общим движением.
+#
+# Все вычисления выполняются матричными операциями numpy над всеми символами
+# сразу, без циклов Python по парам символов.
+#
+# =============================================================================
+
+import numpy as np
+
+# --- КОНСТАНТЫ ---
+MARKET_SYMBOL = 'MARKET'
+
+# Нижняя граница дисперсий, защищающая от деления на ноль
+MIN_VARIANCE = 1e-18
+
+
+class MarketFactorModel:
+    """
+    Экспоненциально взвешенная ковариационная матрица доходностей символов
+    и равновзвешенный рыночный фактор.
+
+    Рыночная доходность m - среднее логарифмических доходностей символов.
+    Из ковариационной матрицы C на каждом цикле векторно получаются
+    дисперсия фактора var(m) = wᵀCw, чувствительности символов к рынку
+    beta = Cw / var(m) и дисперсии остатков diag(C) - beta²·var(m).
+    Движение рынка фиксируется, если |m| превышает порог в единицах
+    ст. отклонения фактора и в ту же сторону движется не меньше min_breadth символов.
+    """
+
+    def __init__(self, market_settings):
+        """
+        Args:
+            market_settings (dict): Секция 'market' конфигурации.
+        """
+        self.reconfigure(market_settings)
+
+        self.symbols = []
+        self._index = {}
+        self._last_prices = np.zeros(0)
+        self._mean = np.zeros(0)
+        self._cov = np.zeros((0, 0))
+        self._observations = np.zeros(0, dtype=int)
+
+    def reconfigure(self, market_settings):
+        """Применяет новые параметры модели, сохраняя накопленную ковариационную матрицу."""
+        self.alpha = 2.0 / (market_settings['ewma_span'] + 1)
+        self.threshold = market_settings['threshold']
+        self.min_breadth = market_settings['min_breadth']
+        self.warmup = market_settings['warmup']
+        self.min_symbols = market_settings['min_symbols']
+
+    def _indices(self, symbols):
+        """Возвращает индексы символов, расширяя матрицы для новых символов."""
+        new_symbols = [s for s in symbols if s not in self._index]
+        if new_symbols:
+            for symbol in new_symbols:
+                self._index[symbol] = len(self.symbols)
+                self.symbols.append(symbol)
+            added = len(new_symbols)
+            self._last_prices = np.concatenate((self._last_prices, np.full(added, np.nan)))
+            self._mean = np.concatenate((self._mean, np.zeros(added)))
+            self._observations = np.concatenate((self._observations, np.zeros(added, dtype=int)))
+            self._cov = np.pad(self._cov, ((0, added), (0, added)))
+        return np.fromiter((self._index[s] for s in symbols), dtype=int, count=len(symbols))
+
+    def _is_full(self, idx):
+        """Проверяет, что idx - это все символы модели в исходном порядке."""
+        return idx.size == len(self.symbols) and bool(np.all(idx == np.arange(idx.size)))
+
+    def update(self, symbols, prices):
+        """
+        Учитывает цены очередного цикла и проверяет, было ли движение всего рынка.
+
+        Args:
+            symbols (list): Символы (без повторов).
+            prices (list or np.ndarray): Текущие цены символов.
+
+        Returns:
+            dict or None: None, если движения рынка нет (или модель еще не прогрета).
+                          Иначе словарь с информацией о событии в формате аномалии
+                          (symbol = 'MARKET', доходности в процентах) и ключами
+                          'market_move' - признак события рынка,
+                          'breadth' - доля символов, движущихся вместе с рынком,
+                          'idiosyncratic' - множество символов, чье движение
+                          не объясняется рынком,
+                          'explained' - множество проверенных моделью символов,
+                          чье движение объясняется рынком.
+        """
+        idx = self._indices(symbols)
+        prices = np.asarray(prices, dtype=float)
+        previous = self._last_prices[idx]
+        self._last_prices[idx] = prices
+
+        # Доходность есть только у символов, для которых известна прошлая цена
+        observed = ~np.isnan(previous) & (previous > 0) & (prices > 0)
+        idx, returns = idx[observed], np.log(prices[observed] / previous[observed])
+        if idx.size == 0:
+            return None
+
+        mean = self._mean[idx]
+        ready = self._observations[idx] >= self.warmup
+        event = None
+        if ready.sum() >= self.min_symbols:
+            event = self._detect(idx[ready], returns[ready], mean[ready])
+
+        # Экспоненциально взвешенное обновление среднего и ковариаций наблюдавшихся символов
+        deviations = returns - mean
+        if self._is_full(idx):
+            # Обычный случай - пришли цены всех символов: обновляем матрицу на месте без копий
+            self._cov += self.alpha * np.outer(deviations, deviations)
+            self._cov *= 1 - self.alpha
+        else:
+            block = np.ix_(idx, idx)
+            self._cov[block] = (1 - self.alpha) * (self._cov[block] + self.alpha * np.outer(deviations, deviations))
+        self._mean[idx] = mean + self.alpha * deviations
+        self._observations[idx] += 1
+
+        return event
+
+    def _detect(self, idx, returns, mean):
+        """Проверяет рыночный фактор и рассчитывает идиосинкратические отклонения."""
+        cov = self._cov if self._is_full(idx) else self._cov[np.ix_(idx, idx)]
+        weights = np.full(idx.size, 1.0 / idx.size)
+
+        cov_with_market = cov @ weights
+        market_var = max(float(weights @ cov_with_market), MIN_VARIANCE)
+        market_std = np.sqrt(market_var)
+        market_deviation = float(weights @ (returns - mean))
+        if abs(market_deviation) < self.threshold * market_std:
+            return None
+
+        direction = np.sign(market_deviation)
+        breadth = float(np.mean(np.sign(returns - mean) == direction))
+        if breadth < self.min_breadth:
+            return None
+
+        # Остаток доходности после вычета вклада рынка и его ст. отклонение.
+        # При сильном движении рынка ошибка оценки beta умножается на величину
+        # движения, поэтому дисперсию остатка расширяем как для прогноза регрессии
+        # по effective_count наблюдениям: var·(1 + m² / (n·var(m)))
+        betas = cov_with_market / market_var
+        residuals = (returns - mean) - betas * market_deviation
+        residual_var = np.maximum(np.diag(cov) - betas ** 2 * market_var, MIN_VARIANCE)
+        effective_count = (2 - self.alpha) / self.alpha
+        residual_var *= 1 + market_deviation ** 2 / (effective_count * market_var)
+        idiosyncratic = np.abs(residuals) >= self.threshold * np.sqrt(residual_var)
+
+        market_return = float(weights @ returns)
+        expected = float(weights @ mean)
+        return {
+            'symbol': MARKET_SYMBOL,
+            'price': round(100 * market_return, 4),
+            'mean': round(100 * expected, 4),
+            'deviation': round(100 * abs(market_deviation), 4),
+            'upper_bound': round(100 * (expected + self.threshold * market_std), 4),
+            'lower_bound': round(100 * (expected - self.threshold * market_std), 4),
+            'market_move': True,
+            'breadth': round(breadth, 4),
+            'idiosyncratic': {self.symbols[i] for i in idx[idiosyncratic]},
+            'explained': {self.symbols[i] for i in idx[~idiosyncratic]}
+        }
+
+    def remove_symbol(self, symbol):
+        """Удаляет символ и его строку/столбец ковариационной матрицы."""
+        i = self._index.pop(symbol, None)
+        if i is None:
+            return
+        del self.symbols[i]
+        self._last_prices = np.delete(self._last_prices, i)
+        self._mean = np.delete(self._mean, i)
+        self._observations = np.delete(self._observations, i)
+        self._cov = np.delete(np.delete(self._cov, i, axis=0), i, axis=1)
+        self._index = {s: j for j, s in enumerate(self.symbols)}
+
+
+def split_market_anomalies(market_event, anomalies):
+    """
+    Сворачивает аномалии символов, вызванные движением рынка, в одно событие.
+
+    Args:
+        market_event (dict or None): Результат MarketFactorModel.update.
+        anomalies (list): Аномалии символов, найденные детекторами за цикл.
+
+    Returns:
+        list: Если движения рынка нет - исходный список. Иначе событие рынка, за которым
+              следуют аномалии символов, чье движение не объясняется рынком. Аномалии
+              символов, которые модель не проверяла (еще не прогреты, только что
+              добавлены, нет прошлой цены), сохраняются без изменений.
+    """
+    if market_event is None:
+        return anomalies
+    return [market_event] + [a for a in anomalies if a['symbol'] not in market_event['explained']]
+
+
+# --- Пример использования (для тестирования модуля) ---
+if __name__ == '__main__':
+    print("--- Тестирование модуля market_analyzer.py ---")
+
+    test_settings = {'ewma_span': 60, 'threshold': 3.0, 'min_breadth': 0.6, 'warmup': 30, 'min_symbols': 3}
+    model = MarketFactorModel(test_settings)
+
+    rng = np.random.default_rng(7)
+    symbols_count = 300
+    test_symbols = [f"SIM{i + 1:04d}/USDT" for i in range(symbols_count)]
+    test_prices = 100 * np.exp(rng.normal(0, 1, symbols_count))
+    betas_true = rng.uniform(0.5, 1.5, symbols_count)
+
+    # --- Тест 1: Обычные колебания не считаются движением рынка ---
+    false_events = 0
+    for _ in range(200):
+        market_shock = rng.normal(0, 0.002)
+        test_prices *= np.exp(betas_true * market_shock + rng.normal(0, 0.002, symbols_count))
+        if model.update(test_symbols, test_prices):
+            false_events += 1
+    print(f"Ложных движений рынка за 200 спокойных циклов: {false_events}")
+
+    # --- Тест 2: Падение рынка на 3% и отдельный скачок одного символа ---
+    test_prices *= np.exp(betas_true * -0.03 + rng.normal(0, 0.002, symbols_count))
+    test_prices[0] *= 1.05
+    event = model.update(test_symbols, test_prices)
+    if event and test_symbols[0] in event['idiosyncratic']:
+        print(f"УСПЕХ: Движение рынка {event['price']}%, охват {event['breadth']:.0%}, "
+              f"идиосинкратических символов: {len(event['idiosyncratic'])}")
+    else:
+        print(f"ОШИБКА ТЕСТА: Неожиданный результат {event}.")
+
+    # --- Тест 3: Аномалии символов, которые модель не проверяла, не теряются ---
+    if event:
+        test_anomalies = [{'symbol': test_symbols[1]}, {'symbol': test_symbols[0]}, {'symbol': 'NEW/USDT'}]
+        kept = [a['symbol'] for a in split_market_anomalies(event, test_anomalies)[1:]]
+        if kept == [test_symbols[0], 'NEW/USDT']:
+            print("УСПЕХ: Сохранены идиосинкратическая аномалия и аномалия непрогретого символа.")
+        else:
+            print(f"ОШИБКА ТЕСТА: После свертки остались аномалии {kept}.")
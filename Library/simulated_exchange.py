@@ -0,0 +1,263 @@
+# =============================================================================
+# Модуль: Library/simulated_exchange.py
+#
+# Описание:
+# Этот модуль содержит локальную (внутрипроцессную) имитацию криптобиржи.
+# Класс SimulatedExchange реализует те методы ccxt, которыми пользуется
+# проект (load_markets, fetch_ticker, fetch_tickers, fetch_ohlcv), и позволяет
+# проводить нагрузочное тестирование приложения без доступа к сети:
+# с тысячами символов, искусственными скачками цен, задержками и ошибками API.
+#
+# =============================================================================
+
+import time
+from collections import deque
+from datetime import datetime, timezone
+
+import ccxt
+import numpy as np
+
+# --- КОНСТАНТЫ ---
+SIMULATED_EXCHANGE_NAME = 'simulated'
+
+# Параметры симуляции по умолчанию (используются, если в config.ini нет секции [Simulation])
+DEFAULT_SIMULATION_SETTINGS = {
+    'symbols_count': 0,
+    'seed': 42,
+    'initial_price': 100.0,
+    'volatility': 0.001,
+    'spike_probability': 0.01,
+    'spike_magnitude': 0.05,
+    'latency_ms': 50.0,
+    'latency_jitter_ms': 20.0,
+    'error_rate': 0.0
+}
+
+# Сколько последних внедренных скачков хранить для сверки с найденными аномалиями
+MAX_INJECTED_SPIKES = 10000
+
+# Длительность таймфреймов ccxt в секундах
+TIMEFRAME_UNITS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400, 'w': 604800}
+
+
+class SimulatedExchange:
+    """
+    Имитация биржи с интерфейсом, совместимым с используемой частью ccxt.Exchange.
+
+    Цены всех символов моделируются векторно (numpy) как геометрическое
+    случайное блуждание: каждый запрос тикеров продвигает рынок на один шаг.
+    С вероятностью spike_probability цена символа на текущем шаге отклоняется
+    на spike_magnitude (разовый скачок, который затем исчезает) - именно такие
+    события приложение должно распознавать как аномалии.
+
+    Перед каждым запросом имитируется сетевая задержка (нормальное распределение
+    latency_ms ± latency_jitter_ms), а с вероятностью error_rate запрос
+    завершается исключением ccxt.NetworkError.
+    """
+
+    id = SIMULATED_EXCHANGE_NAME
+    name = 'Simulated Exchange'
+
+    def __init__(self, settings=None, symbols=None):
+        """
+        Args:
+            settings (dict, optional): Параметры симуляции (секция 'simulation'
+                                       конфигурации). Отсутствующие ключи берутся
+                                       из DEFAULT_SIMULATION_SETTINGS.
+            symbols (list, optional): Символы, которые должны присутствовать на бирже
+                                      (обычно список из config.ini). К ним добавляется
+                                      symbols_count синтетических символов вида SIM0001/USDT.
+        """
+        self.settings = dict(DEFAULT_SIMULATION_SETTINGS)
+        if settings:
+            self.settings.update(settings)
+
+        self.has = {'fetchTicker': True, 'fetchTickers': True, 'fetchOHLCV': True}
+        self.rng = np.random.default_rng(self.settings['seed'])
+
+        # Список символов: сначала заданные явно, затем синтетические
+        self.symbols = list(dict.fromkeys(symbols or []))
+        for i in range(int(self.settings['symbols_count'])):
+            self.symbols.append(f"SIM{i + 1:04d}/USDT")
+        self._symbol_index = {symbol: i for i, symbol in enumerate(self.symbols)}
+        self.markets = None
+
+        # Базовые цены разносим на порядок вокруг initial_price, чтобы символы различались
+        count = len(self.symbols)
+        self._prices = self.settings['initial_price'] * np.exp(self.rng.normal(0.0, 1.0, count))
+        self._quoted = self._prices.copy()
+
+        # Журнал внедренных скачков: (timestamp_ms, symbol, price)
+        self.injected_spikes = deque(maxlen=MAX_INJECTED_SPIKES)
+
+    # --- Вспомогательные методы ccxt ---
+
+    @staticmethod
+    def milliseconds():
+        """Текущее время в миллисекундах (аналог ccxt.Exchange.milliseconds)."""
+        return int(time.time() * 1000)
+
+    @staticmethod
+    def iso8601(timestamp_ms):
+        """Преобразует метку времени в миллисекундах в строку ISO 8601."""
+        return datetime.fromtimestamp(timestamp_ms / 1000, tz=timezone.utc).isoformat()
+
+    @staticmethod
+    def parse_timeframe(timeframe):
+        """Возвращает длительность таймфрейма ccxt (например, '1m', '4h') в секундах."""
+        try:
+            return int(timeframe[:-1]) * TIMEFRAME_UNITS[timeframe[-1]]
+        except (KeyError, ValueError):
+            raise ccxt.BadRequest(f"Неподдерживаемый таймфрейм: {timeframe}")
+
+    # --- Имитация сети ---
+
+    def _simulate_request(self):
+        """Имитирует задержку сети и случайные ошибки API."""
+        latency_ms = self.rng.normal(self.settings['latency_ms'], self.settings['latency_jitter_ms'])
+        if latency_ms > 0:
+            time.sleep(latency_ms / 1000)
+
+        if self.settings['error_rate'] > 0 and self.rng.random() < self.settings['error_rate']:
+            raise ccxt.NetworkError(f"{self.id}: имитация сетевой ошибки")
+
+    def _advance(self):
+        """Продвигает все цены на один шаг и внедряет случайные скачки."""
+        count = len(self.symbols)
+        if count == 0:
+            return
+
+        returns = self.rng.normal(0.0, self.settings['volatility'], count)
+        self._prices = self._prices * np.exp(returns)
+        self._quoted = self._prices.copy()
+
+        spikes = np.flatnonzero(self.rng.random(count) < self.settings['spike_probability'])
+        if spikes.size:
+            directions = self.rng.choice([-1.0, 1.0], spikes.size)
+            self._quoted[spikes] *= 1.0 + directions * self.settings['spike_magnitude']
+            timestamp = self.milliseconds()
+            for i in spikes:
+                self.injected_spikes.append((timestamp, self.symbols[i], float(self._quoted[i])))
+
+    def _get_index(self, symbol):
+        """Возвращает индекс символа или вызывает ccxt.BadSymbol, как настоящая биржа."""
+        try:
+            return self._symbol_index[symbol]
+        except KeyError:
+            raise ccxt.BadSymbol(f"{self.id} does not have market symbol {symbol}")
+
+    def _build_ticker(self, index, timestamp):
+        """Формирует словарь тикера в формате ccxt."""
+        last = float(self._quoted[index])
+        return {
+            'symbol': self.symbols[index],
+            'timestamp': timestamp,
+            'datetime': self.iso8601(timestamp),
+            'last': last,
+            'close': last,
+            'bid': last * 0.9999,
+            'ask': last * 1.0001,
+            'baseVolume': None,
+            'info': {}
+        }
+
+    # --- Публичные методы ccxt ---
+
+    def load_markets(self, reload=False, params=None):
+        """Возвращает словарь рынков {symbol: market} в формате ccxt."""
+        if self.markets is None or reload:
+            self._simulate_request()
+            self.markets = {}
+            for symbol in self.symbols:
+                base, quote = symbol.split('/')
+                self.markets[symbol] = {
+                    'id': f"{base}{quote}",
+                    'symbol': symbol,
+                    'base': base,
+                    'quote': quote,
+                    'type': 'spot',
+                    'spot': True,
+                    'active': True
+                }
+        return self.markets
+
+    def fetch_ticker(self, symbol, params=None):
+        """Возвращает тикер одного символа."""
+        index = self._get_index(symbol)
+        self._simulate_request()
+        self._advance()
+        return self._build_ticker(index, self.milliseconds())
+
+    def fetch_tickers(self, symbols=None, params=None):
+        """Возвращает словарь тикеров {symbol: ticker} для списка символов (или для всех)."""
+        indices = range(len(self.symbols)) if symbols is None else [self._get_index(s) for s in symbols]
+        self._simulate_request()
+        self._advance()
+        timestamp = self.milliseconds()
+        return {self.symbols[i]: self._build_ticker(i, timestamp) for i in indices}
+
+    def fetch_ohlcv(self, symbol, timeframe='1m', since=None, limit=None, params=None):
+        """
+        Возвращает синтетические свечи [timestamp, open, high, low, close, volume],
+        заканчивающиеся текущей ценой символа.
+        """
+        index = self._get_index(symbol)
+        self._simulate_request()
+
+        limit = limit or 100
+        timeframe_ms = self.parse_timeframe(timeframe) * 1000
+        if since is None:
+            since = self.milliseconds() - limit * timeframe_ms
+        since -= since % timeframe_ms
+
+        # Блуждание строим назад от текущей цены; волатильность масштабируем
+        # по числу минут в свече, чтобы разные таймфреймы были сопоставимы
+        candle_volatility = self.settings['volatility'] * np.sqrt(max(timeframe_ms / 60000, 1.0))
+        returns = self.rng.normal(0.0, candle_volatility, limit)
+        log_offsets = np.concatenate((np.cumsum(returns[:0:-1])[::-1], [0.0]))
+        closes = self._prices[index] * np.exp(-log_offsets)
+        opens = np.concatenate(([closes[0] * np.exp(-returns[0])], closes[:-1]))
+        wicks = np.abs(self.rng.normal(0.0, candle_volatility / 2, (2, limit)))
+        highs = np.maximum(opens, closes) * (1 + wicks[0])
+        lows = np.minimum(opens, closes) * (1 - wicks[1])
+        volumes = self.rng.uniform(10.0, 1000.0, limit)
+
+        return [
+            [since + i * timeframe_ms, float(opens[i]), float(highs[i]), float(lows[i]),
+             float(closes[i]), float(volumes[i])]
+            for i in range(limit)
+        ]
+
+
+# --- Пример использования (для тестирования модуля) ---
+if __name__ == '__main__':
+    print("--- Тестирование модуля simulated_exchange.py ---")
+
+    test_settings = {
+        'symbols_count': 5000,
+        'spike_probability': 0.001,
+        'latency_ms': 0.0,
+        'latency_jitter_ms': 0.0,
+        'error_rate': 0.1
+    }
+    exchange_instance = SimulatedExchange(test_settings, symbols=['BTC/USDT', 'ETH/USDT'])
+    print(f"Символов на бирже: {len(exchange_instance.load_markets())}")
+
+    errors = 0
+    start = time.perf_counter()
+    for _ in range(20):
+        try:
+            exchange_instance.fetch_tickers(exchange_instance.symbols)
+        except ccxt.NetworkError:
+            errors += 1
+    elapsed = time.perf_counter() - start
+    print(f"20 запросов по {len(exchange_instance.symbols)} тикеров: {elapsed:.3f} с, ошибок: {errors}")
+    print(f"Внедрено скачков: {len(exchange_instance.injected_spikes)}")
+
+    try:
+        exchange_instance.fetch_ticker('INVALID/SYMBOL')
+    except ccxt.BadSymbol as e:
+        print(f"УСПЕХ: Неизвестный символ отклонен: {e}")
+
+    candles = exchange_instance.fetch_ohlcv('BTC/USDT', '5m', limit=3)
+    print(f"Свечи BTC/USDT (5m): {candles}")
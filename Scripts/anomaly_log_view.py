@@ -0,0 +1,186 @@
+# =============================================================================
+# Модуль: Scripts/anomaly_log_view.py
+#
+# Описание:
+# Виртуализированная таблица лога аномалий. В Treeview всегда создано ровно
+# столько строк, сколько видно на экране; при прокрутке, фильтрации и появлении
+# новых аномалий меняются только значения этих строк. Данные берутся из
+# кольцевого буфера последних аномалий в памяти, а более старые страницы -
+# из хранилища аномалий (Library/anomaly_store.py). Поэтому память и время
+# вставки не растут, сколько бы приложение ни работало.
+#
+# =============================================================================
+
+from collections import deque
+from itertools import islice
+
+import tkinter as tk
+
+import Scripts.ui_manager as ui
+from Library.market_analyzer import MARKET_SYMBOL
+
+# --- КОНСТАНТЫ ---
+ALL_SYMBOLS_LABEL = 'Все символы'
+
+
+class VirtualAnomalyLog:
+    """
+    Лог аномалий с прокруткой по всей истории и фильтром по символу.
+
+    Строки упорядочены от новых к старым. Кольцевой буфер хранит ring_size
+    самых новых записей хранилища в уже отформатированном виде; строки,
+    выходящие за буфер, запрашиваются у хранилища постранично.
+    Все методы вызываются в потоке Tkinter.
+    """
+
+    def __init__(self, tree, scrollbar, filter_box, store, ring_size):
+        """
+        Args:
+            tree (ttk.Treeview): Таблица лога (высота задает число видимых строк).
+            scrollbar (ttk.Scrollbar): Вертикальная полоса прокрутки таблицы.
+            filter_box (ttk.Combobox): Выпадающий список фильтра по символу.
+            store (AnomalyStore): Хранилище аномалий.
+            ring_size (int): Сколько последних аномалий держать в памяти.
+        """
+        self.tree = tree
+        self.scrollbar = scrollbar
+        self.filter_box = filter_box
+        self.store = store
+        self.page_size = int(tree.cget('height'))
+
+        self._ring = deque(maxlen=ring_size)  # значения строк, самые новые - слева
+        self._offset = 0  # номер первой видимой строки (0 - самая новая)
+        self._symbol = None  # фильтр по символу (None - все символы)
+        # Последняя страница из хранилища: (номер первой строки, строки, последняя ли это страница).
+        # Новые аномалии сдвигают ее номер, поэтому хранилище запрашивается заново
+        # только при прокрутке за ее пределы, смене фильтра и перечитывании лога
+        self._older = None
+
+        # Строки таблицы создаются один раз и затем только переиспользуются
+        self._items = [tree.insert("", tk.END) for _ in range(self.page_size)]
+        self._attached = self.page_size
+
+        scrollbar.config(command=self._on_scrollbar)
+        tree.bind('<MouseWheel>', self._on_mouse_wheel)  # Windows, macOS
+        tree.bind('<Button-4>', lambda event: self.scroll(-1))  # Linux
+        tree.bind('<Button-5>', lambda event: self.scroll(1))
+        filter_box.bind('<<ComboboxSelected>>', self._on_filter_selected)
+        self.set_symbols([])
+
+    # --- Данные ---
+
+    def set_symbols(self, symbols):
+        """Задает список символов для фильтра."""
+        self.filter_box['values'] = [ALL_SYMBOLS_LABEL, MARKET_SYMBOL] + list(symbols)
+        if self._symbol is None:
+            self.filter_box.set(ALL_SYMBOLS_LABEL)
+
+    def reload(self):
+        """Заполняет кольцевой буфер последними аномалиями из хранилища и показывает начало лога."""
+        recent_df = self.store.query_anomalies(limit=self._ring.maxlen)
+        self._ring.clear()
+        self._ring.extend(ui.format_anomaly_row(row, row['timestamp']) for row in recent_df.to_dict('records'))
+        self._offset = 0
+        self._older = None
+        self.render()
+
+    def add_many(self, anomalies):
+        """
+        Добавляет новые аномалии и перерисовывает видимые строки.
+
+        Args:
+            anomalies (list): Пары (время обнаружения, словарь аномалии) в порядке обнаружения.
+        """
+        if not anomalies:
+            return
+        for detected_at, anomaly in anomalies:
+            row = ui.format_anomaly_row(anomaly, detected_at)
+            self._ring.appendleft(row)
+            if self._matches(row):
+                # Если пользователь пролистал лог вниз, видимые строки не должны "уезжать"
+                if self._offset:
+                    self._offset += 1
+                if self._older:
+                    self._older = (self._older[0] + 1,) + self._older[1:]
+        self.render()
+
+    def _matches(self, row):
+        return self._symbol is None or row[1] == self._symbol
+
+    def _ring_rows(self):
+        """Строки кольцевого буфера с учетом фильтра."""
+        if self._symbol is None:
+            return self._ring
+        return [row for row in self._ring if row[1] == self._symbol]
+
+    def _total(self, ring_rows):
+        """Общее число строк: по индексам хранилища (буфер - его самая новая часть)."""
+        return max(self.store.count(self._symbol), len(ring_rows))
+
+    def _page(self, ring_rows):
+        """Строки видимой страницы: из буфера, а за его пределами - из хранилища."""
+        rows = list(islice(ring_rows, self._offset, self._offset + self.page_size))
+        if len(rows) < self.page_size:
+            rows.extend(self._older_rows(max(self._offset, len(ring_rows)), self.page_size - len(rows)))
+        return rows
+
+    def _older_rows(self, store_offset, limit):
+        """Строки хранилища начиная с номера store_offset (из последней страницы, если она их содержит)."""
+        if self._older:
+            start, older_rows, exhausted = self._older
+            if start <= store_offset and (store_offset + limit <= start + len(older_rows) or exhausted):
+                return older_rows[store_offset - start:store_offset - start + limit]
+        # Запрашивается целая страница, чтобы при появлении новых аномалий ее хватило и для меньшего limit
+        older_df = self.store.query_anomalies(symbol=self._symbol, offset=store_offset, limit=self.page_size)
+        older_rows = [ui.format_anomaly_row(row, row['timestamp']) for row in older_df.to_dict('records')]
+        self._older = (store_offset, older_rows, len(older_rows) < self.page_size)
+        return older_rows[:limit]
+
+    # --- Отрисовка ---
+
+    def render(self):
+        """Переписывает значения видимых строк и положение полосы прокрутки."""
+        ring_rows = self._ring_rows()
+        total = self._total(ring_rows)
+        self._offset = max(0, min(self._offset, total - self.page_size))
+        rows = self._page(ring_rows)
+
+        for i, item in enumerate(self._items):
+            if i < len(rows):
+                self.tree.item(item, values=rows[i])
+            elif i < self._attached:
+                self.tree.detach(item)
+        # Пустые строки скрываются (detach) и возвращаются на место, когда данных становится больше
+        for i in range(self._attached, len(rows)):
+            self.tree.move(self._items[i], "", i)
+        self._attached = len(rows)
+
+        if total:
+            self.scrollbar.set(self._offset / total, (self._offset + len(rows)) / total)
+        else:
+            self.scrollbar.set(0.0, 1.0)
+
+    def scroll(self, rows):
+        """Прокручивает лог на заданное число строк (положительное - к старым записям)."""
+        self._offset += rows
+        self.render()
+
+    # --- Обработчики событий ---
+
+    def _on_scrollbar(self, action, value, unit=None):
+        if action == 'moveto':
+            self._offset = int(float(value) * self._total(self._ring_rows()))
+            self.render()
+        elif action == 'scroll':
+            step = self.page_size if unit == 'pages' else 1
+            self.scroll(int(value) * step)
+
+    def _on_mouse_wheel(self, event):
+        self.scroll(-1 if event.delta > 0 else 1)
+
+    def _on_filter_selected(self, event):
+        selected = self.filter_box.get()
+        self._symbol = None if selected == ALL_SYMBOLS_LABEL else selected
+        self._offset = 0
+        self._older = None
+        self.render()
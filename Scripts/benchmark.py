@@ -0,0 +1,131 @@
+# =============================================================================
+# Модуль: Scripts/benchmark.py
+#
+# Описание:
+# Замеры производительности алгоритмов поиска аномалий на синтетических данных.
+# Сравнивает исходную проверку find_anomalies (фильтрация истории pandas
+# на каждый символ) с проверкой нескольких окон по префиксным суммам
+# и с потоковыми детекторами из Library/detectors.py (пакетный вызов на цикл),
+# а также замеряет модель рыночного фактора из Library/market_analyzer.py.
+#
+# Пример запуска (из папки Scripts):
+# python benchmark.py --symbols 500 --cycles 200
+#
+# =============================================================================
+
+import os
+import sys
+import time
+import argparse
+
+import numpy as np
+import pandas as pd
+
+# --- Добавляем путь к корневой директории проекта, чтобы импорты работали ---
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.append(project_root)
+
+import Library.data_analyzer as analyzer
+import Library.detectors as detectors
+import Library.market_analyzer as market
+
+# --- КОНСТАНТЫ ---
+BENCHMARK_WINDOWS = [5, 20, 120]
+BENCHMARK_THRESHOLD = 2.5
+
+
+def generate_prices(symbols_count, cycles, seed=42):
+    """Генерирует матрицу цен (cycles x symbols_count) как геометрическое случайное блуждание."""
+    rng = np.random.default_rng(seed)
+    returns = rng.normal(0.0, 0.001, (cycles, symbols_count))
+    return 100.0 * np.exp(np.cumsum(returns, axis=0))
+
+
+def report(name, elapsed, cycles, symbols_count):
+    """Печатает строку результатов замера."""
+    per_update_us = 1e6 * elapsed / (cycles * symbols_count)
+    print(f"{name:<45} {elapsed:8.3f} с   {per_update_us:8.2f} мкс/цена")
+
+
+def bench_legacy(prices, symbols, window):
+    """Исходный алгоритм: фильтрация истории DataFrame для каждого символа на каждом цикле."""
+    history_df = pd.DataFrame(columns=['symbol', 'price'])
+    max_history_size = len(symbols) * analyzer.DEFAULT_BUFFER_LENGTH
+    start = time.perf_counter()
+    for row in prices:
+        current_df = pd.DataFrame({'symbol': symbols, 'price': row})
+        history_df = pd.concat([history_df, current_df], ignore_index=True).tail(max_history_size)
+        for symbol, price in zip(symbols, row):
+            analyzer.find_anomalies(history_df, price, symbol, window, BENCHMARK_THRESHOLD)
+    return time.perf_counter() - start
+
+
+def bench_prefix_windows(prices, symbols, windows):
+    """Проверка нескольких окон по буферам префиксных сумм."""
+    buffers = {symbol: analyzer.RollingPrefixBuffer() for symbol in symbols}
+    start = time.perf_counter()
+    for row in prices:
+        for symbol, price in zip(symbols, row):
+            buffer = buffers[symbol]
+            analyzer.find_anomalies_multi(buffer, price, symbol, windows, BENCHMARK_THRESHOLD)
+            buffer.append(price)
+    return time.perf_counter() - start
+
+
+def bench_detector(prices, symbols, detector_name):
+    """Детектор из движка детекторов: один пакетный вызов на цикл для всех символов."""
+    analysis_settings = {
+        'standard_deviation_threshold': BENCHMARK_THRESHOLD,
+        'moving_average_windows': BENCHMARK_WINDOWS,
+        'ewma_span': BENCHMARK_WINDOWS[1],
+        'mad_window': BENCHMARK_WINDOWS[1],
+        'detector': detector_name
+    }
+    engine = detectors.DetectorEngine(analysis_settings)
+    start = time.perf_counter()
+    for row in prices:
+        engine.process(symbols, row)
+    return time.perf_counter() - start
+
+
+def bench_market_model(prices, symbols):
+    """Обновление ковариаций и проверка движения рынка для всех символов за цикл."""
+    market_settings = {'ewma_span': 120, 'threshold': 4.0, 'min_breadth': 0.7, 'warmup': 30, 'min_symbols': 3}
+    model = market.MarketFactorModel(market_settings)
+    start = time.perf_counter()
+    for row in prices:
+        model.update(symbols, row)
+    return time.perf_counter() - start
+
+
+def run_benchmarks(symbols_count, cycles, legacy_cycles):
+    """Запускает все замеры и печатает результаты."""
+    symbols = [f"SIM{i + 1:04d}/USDT" for i in range(symbols_count)]
+    prices = generate_prices(symbols_count, cycles)
+    print(f"Символов: {symbols_count}, циклов: {cycles}, окна: {BENCHMARK_WINDOWS}\n")
+
+    if legacy_cycles:
+        legacy_prices = prices[:legacy_cycles]
+        report(f"find_anomalies, окно {BENCHMARK_WINDOWS[1]} ({legacy_cycles} циклов)",
+               bench_legacy(legacy_prices, symbols, BENCHMARK_WINDOWS[1]), legacy_cycles, symbols_count)
+
+    report("find_anomalies_multi, 1 окно",
+           bench_prefix_windows(prices, symbols, BENCHMARK_WINDOWS[1:2]), cycles, symbols_count)
+    report(f"find_anomalies_multi, {len(BENCHMARK_WINDOWS)} окна",
+           bench_prefix_windows(prices, symbols, BENCHMARK_WINDOWS), cycles, symbols_count)
+
+    for detector_name in detectors.DETECTOR_CLASSES:
+        report(f"Детектор {detector_name}", bench_detector(prices, symbols, detector_name), cycles, symbols_count)
+
+    report("Модель рыночного фактора", bench_market_model(prices, symbols), cycles, symbols_count)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Замеры производительности поиска аномалий.")
+    parser.add_argument('--symbols', type=int, default=100, help="Количество символов.")
+    parser.add_argument('--cycles', type=int, default=300, help="Количество циклов обновления.")
+    parser.add_argument('--legacy-cycles', type=int, default=30,
+                        help="Сколько циклов прогонять медленным исходным алгоритмом (0 - пропустить).")
+    args = parser.parse_args()
+
+    run_benchmarks(args.symbols, args.cycles, args.legacy_cycles)
@@ -32,12 +32,16 @@ def load_config(path=CONFIG_FILE_PATH):
     Raises:
         FileNotFoundError: Если файл конфигурации не найден.
         KeyError: Если обязательная секция или параметр отсутствует в файле.
+        ValueError: Если файл содержит синтаксические ошибки или недопустимые значения.
     """
     if not os.path.exists(path):
         raise FileNotFoundError(f"Файл конфигурации не найден по пути: {path}")
 
     config = configparser.ConfigParser()
-    config.read(path, encoding='utf-8')
+    try:
+        config.read(path, encoding='utf-8')
+    except configparser.Error as e:
+        raise ValueError(f"Ошибка синтаксиса в файле конфигурации: {e}")
 
     settings = {}
 
@@ -45,15 +49,34 @@ def load_config(path=CONFIG_FILE_PATH):
         # --- Секция API ---
         settings['api'] = {
             'exchange': config.get('API', 'exchange'),
-            'symbols': [s.strip() for s in config.get('API', 'symbols').split(',')]
+            'symbols': [s.strip() for s in config.get('API', 'symbols').split(',') if s.strip()]
         }
 
         # --- Секция Analysis ---
         settings['analysis'] = {
-            'update_interval_seconds': config.getint('Analysis', 'update_interval_seconds'),
+            'update_interval_seconds': config.getfloat('Analysis', 'update_interval_seconds'),
             'moving_average_window': config.getint('Analysis', 'moving_average_window'),
             'standard_deviation_threshold': config.getfloat('Analysis', 'standard_deviation_threshold')
         }
+        # Необязательный список окон; по умолчанию используется одно окно moving_average_window
+        windows = config.get('Analysis', 'moving_average_windows', fallback='')
+        settings['analysis']['moving_average_windows'] = (
+            [int(w) for w in windows.split(',') if w.strip()]
+            or [settings['analysis']['moving_average_window']]
+        )
+        # Детектор аномалий по умолчанию и параметры потоковых детекторов
+        settings['analysis']['detector'] = config.get('Analysis', 'detector', fallback='sma').strip().lower()
+        settings['analysis']['ewma_span'] = config.getint(
+            'Analysis', 'ewma_span', fallback=settings['analysis']['moving_average_window'])
+        settings['analysis']['mad_window'] = config.getint(
+            'Analysis', 'mad_window', fallback=settings['analysis']['moving_average_window'])
+
+        # --- Секция Detectors (необязательная): детекторы для отдельных символов ---
+        # configparser приводит ключи к нижнему регистру, символы бирж - в верхнем
+        settings['detectors'] = {}
+        if config.has_section('Detectors'):
+            settings['detectors'] = {symbol.upper(): name.strip().lower()
+                                     for symbol, name in config.items('Detectors')}
 
         # --- Секция UI ---
         settings['ui'] = {
@@ -64,23 +87,149 @@ def load_config(path=CONFIG_FILE_PATH):
             'text_color': config.get('UI', 'text_color'),
             'success_color': config.get('UI', 'success_color'),
             'anomaly_color': config.get('UI', 'anomaly_color'),
-            'graph_line_color': config.get('UI', 'graph_line_color')
+            'graph_line_color': config.get('UI', 'graph_line_color'),
+            # Бюджет отрисовки: частота кадров, время на кадр и частота перерисовки графика
+            'max_fps': config.getfloat('UI', 'max_fps', fallback=10.0),
+            'frame_budget_ms': config.getfloat('UI', 'frame_budget_ms', fallback=30.0),
+            'graph_min_interval_ms': config.getfloat('UI', 'graph_min_interval_ms', fallback=1000.0),
+            'max_pending_anomalies': config.getint('UI', 'max_pending_anomalies', fallback=1000),
+            # Лог аномалий: видимые строки и размер буфера последних аномалий в памяти
+            'anomaly_log_rows': config.getint('UI', 'anomaly_log_rows', fallback=8),
+            'anomaly_ring_size': config.getint('UI', 'anomaly_ring_size', fallback=1000)
         }
 
         # --- Секция Logging ---
         settings['logging'] = {
-            'log_file': config.get('Logging', 'log_file')
+            'log_file': config.get('Logging', 'log_file'),
+            'store_dir': config.get('Logging', 'store_dir', fallback='../Output/anomalies'),
+            'retention_days': config.getint('Logging', 'retention_days', fallback=0)
+        }
+
+        # --- Секция Export (необязательная): сохранение графиков в файлы ---
+        settings['export'] = {
+            'output_dir': config.get('Export', 'output_dir', fallback='../Graphics'),
+            'dpi': config.getint('Export', 'dpi', fallback=300),
+            # 0 - по числу ядер процессора
+            'max_workers': config.getint('Export', 'max_workers', fallback=0)
+        }
+
+        # --- Секция Market (необязательная): выявление движений всего рынка ---
+        settings['market'] = {
+            'enabled': config.getboolean('Market', 'enabled', fallback=True),
+            'ewma_span': config.getint('Market', 'ewma_span', fallback=120),
+            'threshold': config.getfloat('Market', 'threshold', fallback=4.0),
+            'min_breadth': config.getfloat('Market', 'min_breadth', fallback=0.7),
+            'warmup': config.getint('Market', 'warmup', fallback=30),
+            'min_symbols': config.getint('Market', 'min_symbols', fallback=3)
+        }
+
+        # --- Секция Simulation (необязательная, используется при exchange = simulated) ---
+        settings['simulation'] = {
+            'symbols_count': config.getint('Simulation', 'symbols_count', fallback=0),
+            'seed': config.getint('Simulation', 'seed', fallback=42),
+            'initial_price': config.getfloat('Simulation', 'initial_price', fallback=100.0),
+            'volatility': config.getfloat('Simulation', 'volatility', fallback=0.001),
+            'spike_probability': config.getfloat('Simulation', 'spike_probability', fallback=0.01),
+            'spike_magnitude': config.getfloat('Simulation', 'spike_magnitude', fallback=0.05),
+            'latency_ms': config.getfloat('Simulation', 'latency_ms', fallback=50.0),
+            'latency_jitter_ms': config.getfloat('Simulation', 'latency_jitter_ms', fallback=20.0),
+            'error_rate': config.getfloat('Simulation', 'error_rate', fallback=0.0)
         }
 
     except (configparser.NoSectionError, configparser.NoOptionError) as e:
         raise KeyError(f"Ошибка в файле конфигурации: отсутствует обязательный параметр или секция. {e}")
+    except configparser.Error as e:
+        # Например, одиночный '%' в значении (ошибка интерполяции configparser)
+        raise ValueError(f"Ошибка в значении параметра файла конфигурации: {e}")
+
+    validate_config(settings)
+    return settings
+
+
+def validate_config(settings):
+    """
+    Проверяет допустимость значений параметров.
+
+    Args:
+        settings (dict): Настройки, полученные из load_config.
 
+    Raises:
+        ValueError: Если значение параметра недопустимо.
+    """
     # Проверка на наличие хотя бы одной отслеживаемой криптовалюты
     if not settings['api']['symbols']:
         raise ValueError(
             "В файле конфигурации (секция API, параметр 'symbols') должен быть указан хотя бы один символ для отслеживания.")
 
-    return settings
+    analysis = settings['analysis']
+    if analysis['update_interval_seconds'] <= 0:
+        raise ValueError("Параметр 'update_interval_seconds' должен быть больше 0.")
+    # Стандартное отклонение (ddof=1) определено только для окна из двух и более цен
+    if min(analysis['moving_average_windows'] + [analysis['moving_average_window']]) < 2:
+        raise ValueError("Окна скользящего среднего должны быть не меньше 2.")
+    if analysis['standard_deviation_threshold'] <= 0:
+        raise ValueError("Параметр 'standard_deviation_threshold' должен быть больше 0.")
+    if analysis['ewma_span'] < 1 or analysis['mad_window'] < 1:
+        raise ValueError("Параметры 'ewma_span' и 'mad_window' должны быть не меньше 1.")
+
+    market = settings['market']
+    if market['ewma_span'] < 1 or market['threshold'] <= 0 or not 0 < market['min_breadth'] <= 1:
+        raise ValueError("Недопустимые параметры секции Market: ewma_span >= 1, threshold > 0, "
+                         "0 < min_breadth <= 1.")
+
+    # Бюджет отрисовки и размеры лога аномалий (max_fps = 0 дало бы деление на ноль)
+    ui_settings = settings['ui']
+    if ui_settings['max_fps'] <= 0 or ui_settings['frame_budget_ms'] <= 0 or ui_settings['graph_min_interval_ms'] < 0:
+        raise ValueError("Недопустимые параметры секции UI: max_fps > 0, frame_budget_ms > 0, "
+                         "graph_min_interval_ms >= 0.")
+    if min(ui_settings['anomaly_log_rows'], ui_settings['anomaly_ring_size'],
+           ui_settings['max_pending_anomalies']) < 1:
+        raise ValueError("Параметры 'anomaly_log_rows', 'anomaly_ring_size' и 'max_pending_anomalies' "
+                         "должны быть не меньше 1.")
+
+
+class ConfigWatcher:
+    """
+    Отслеживает изменения файла конфигурации по времени изменения (mtime).
+
+    poll() дешев (один вызов os.stat), поэтому его можно вызывать часто.
+    Файл перечитывается только после изменения, а ошибочный файл не
+    перечитывается повторно, пока его снова не изменят.
+    """
+
+    def __init__(self, path=CONFIG_FILE_PATH):
+        """
+        Args:
+            path (str): Путь к файлу конфигурации.
+        """
+        self.path = path
+        self._signature = self._file_signature()
+
+    def _file_signature(self):
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return None
+        # Размер учитывается на случай двух сохранений в пределах точности mtime
+        return stat.st_mtime_ns, stat.st_size
+
+    def poll(self):
+        """
+        Проверяет, изменился ли файл конфигурации.
+
+        Returns:
+            dict: Новые настройки, если файл изменился и прошел проверку.
+            None: Если файл не менялся.
+
+        Raises:
+            FileNotFoundError, KeyError, ValueError: Если измененный файл
+                отсутствует или содержит ошибки (как в load_config).
+        """
+        signature = self._file_signature()
+        if signature == self._signature:
+            return None
+        self._signature = signature
+        return load_config(self.path)
 
 
 # --- Пример использования (для тестирования модуля) ---
@@ -0,0 +1,50 @@
+# =============================================================================
+# Модуль: Scripts/export_anomalies.py
+#
+# Описание:
+# Отчетный скрипт: выбирает аномалии из хранилища по символу и диапазону
+# времени и выгружает их в один CSV-файл прежнего формата anomaly_log.csv
+# (или печатает краткую сводку, если файл не указан).
+#
+# Пример запуска (из папки Scripts):
+# python export_anomalies.py --symbol BTC/USDT --start 2025-06-01 --end 2025-06-30 --output btc_june.csv
+#
+# =============================================================================
+
+import os
+import sys
+import argparse
+
+# --- Добавляем путь к корневой директории проекта, чтобы импорты работали ---
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.append(project_root)
+
+import Scripts.config_manager as cm
+import Library.anomaly_store as storage
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Выгрузка аномалий из хранилища.")
+    parser.add_argument('--symbol', default=None, help="Символ (например, BTC/USDT). По умолчанию - все.")
+    parser.add_argument('--start', default=None, help="Начало периода (например, 2025-06-01).")
+    parser.add_argument('--end', default=None, help="Конец периода включительно (например, 2025-06-30 - до конца этих суток).")
+    parser.add_argument('--output', default=None, help="CSV-файл для выгрузки. Без него печатается сводка.")
+    parser.add_argument('--config', default=os.path.join(project_root, 'config.ini'),
+                        help="Путь к файлу конфигурации.")
+    args = parser.parse_args()
+
+    try:
+        config = cm.load_config(args.config)
+        store = storage.AnomalyStore(config['logging']['store_dir'], config['logging']['retention_days'])
+
+        if args.output:
+            exported = store.export_csv(args.output, symbol=args.symbol, start=args.start, end=args.end)
+            print(f"Выгружено аномалий: {exported} -> {os.path.abspath(args.output)}")
+        else:
+            result = store.query_anomalies(symbol=args.symbol, start=args.start, end=args.end)
+            print(f"Найдено аномалий: {len(result)}")
+            if not result.empty:
+                print(result['symbol'].value_counts().to_string())
+
+    except (FileNotFoundError, KeyError, ValueError) as e:
+        print(f"ОШИБКА: {e}")
@@ -0,0 +1,170 @@
+# =============================================================================
+# Модуль: Scripts/graph_export.py
+#
+# Описание:
+# Экспорт графиков цен в PNG без блокировки интерфейса. Каждый график
+# рисуется на собственной фигуре matplotlib с бэкендом Agg (не связанной
+# с окном Tkinter): одиночный экспорт выполняется в фоновом потоке,
+# а экспорт всех символов - параллельно в пуле процессов.
+#
+# =============================================================================
+
+import os
+import threading
+import multiprocessing
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, wait, FIRST_COMPLETED
+from datetime import datetime
+
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+
+def style_axes(ax, ui_settings):
+    """Оформляет оси графика в цветах интерфейса."""
+    ax.set_facecolor(ui_settings['background_color'])
+    ax.tick_params(axis='x', colors=ui_settings['text_color'])
+    ax.tick_params(axis='y', colors=ui_settings['text_color'])
+    ax.spines['top'].set_visible(False)
+    ax.spines['right'].set_visible(False)
+    ax.spines['left'].set_color(ui_settings['text_color'])
+    ax.spines['bottom'].set_color(ui_settings['text_color'])
+
+
+def draw_price_history(ax, timestamps, prices, symbol, ui_settings):
+    """Рисует историю цен символа на осях (общий код для окна и для экспорта)."""
+    ax.plot(timestamps, prices, color=ui_settings['graph_line_color'], marker='.', linestyle='-')
+    ax.set_title(f"История цен для {symbol}", color=ui_settings['text_color'])
+    ax.set_ylabel("Цена (USDT)", color=ui_settings['text_color'])
+    # Автоформатирование дат на оси X
+    ax.get_figure().autofmt_xdate()
+
+
+def render_graph_file(symbol, timestamps, prices, ui_settings, output_dir, dpi):
+    """
+    Рисует график символа на отдельной фигуре Agg и сохраняет его в PNG.
+
+    Функция не зависит от Tkinter и состояния приложения, поэтому
+    может выполняться в любом потоке или в отдельном процессе.
+
+    Returns:
+        str: Полный путь к сохраненному файлу.
+    """
+    fig = Figure(figsize=(5, 3), dpi=100, facecolor=ui_settings['background_color'])
+    FigureCanvasAgg(fig)
+    ax = fig.add_subplot(111)
+    style_axes(ax, ui_settings)
+    draw_price_history(ax, timestamps, prices, symbol, ui_settings)
+    ax.grid(True, linestyle='--', alpha=0.6)
+
+    # Формируем имя файла: SYMBOL_YYYYMMDD_HHMMSS.png
+    filename = f"{symbol.replace('/', '_')}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.png"
+    filepath = os.path.abspath(os.path.join(output_dir, filename))
+    fig.savefig(filepath, dpi=dpi, bbox_inches='tight')
+    return filepath
+
+
+class GraphExporter:
+    """
+    Запускает экспорт графиков в фоне.
+
+    Методы возвращают concurrent.futures.Future, готовность которого
+    проверяется из потока Tkinter; ход массового экспорта сообщается
+    через progress_callback (вызывается в фоновом потоке).
+    """
+
+    def __init__(self, export_settings, ui_settings):
+        """
+        Args:
+            export_settings (dict): Секция 'export' конфигурации (output_dir, dpi, max_workers).
+            ui_settings (dict): Секция 'ui' конфигурации (цвета графика).
+        """
+        self.reconfigure(export_settings)
+        self.ui_settings = ui_settings
+        # Один фоновый поток: одиночные экспорты и управление массовым экспортом идут по очереди
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='graph-export')
+        self._cancelled = threading.Event()
+
+    def reconfigure(self, export_settings):
+        """Применяет новые параметры экспорта (действуют со следующего экспорта)."""
+        self.output_dir = export_settings['output_dir']
+        self.dpi = export_settings['dpi']
+        self.max_workers = export_settings['max_workers'] or os.cpu_count()
+
+    @staticmethod
+    def _symbol_series(history_df, symbol):
+        symbol_data = history_df[history_df['symbol'] == symbol]
+        return symbol_data['timestamp'].tolist(), symbol_data['price'].tolist()
+
+    def export_symbol(self, history_df, symbol):
+        """
+        Экспортирует график одного символа в фоновом потоке.
+
+        Returns:
+            Future: Результат - путь к сохраненному файлу.
+        """
+        timestamps, prices = self._symbol_series(history_df, symbol)
+        return self._executor.submit(self._render_one, symbol, timestamps, prices)
+
+    def _render_one(self, symbol, timestamps, prices):
+        os.makedirs(self.output_dir, exist_ok=True)
+        return render_graph_file(symbol, timestamps, prices, self.ui_settings, self.output_dir, self.dpi)
+
+    def export_all(self, history_df, symbols, progress_callback=None):
+        """
+        Экспортирует графики всех символов параллельно в пуле процессов.
+
+        Args:
+            history_df (pd.DataFrame): История цен ['timestamp', 'symbol', 'price'].
+            symbols (list): Символы для экспорта (символы без истории пропускаются).
+            progress_callback (callable, optional): Вызывается как callback(done, total)
+                                                    после каждого готового графика.
+
+        Returns:
+            Future: Результат - кортеж (список путей к файлам, список ошибок).
+        """
+        grouped = {symbol: (group['timestamp'].tolist(), group['price'].tolist())
+                   for symbol, group in history_df.groupby('symbol') if symbol in set(symbols)}
+        return self._executor.submit(self._render_all, grouped, progress_callback)
+
+    def _render_all(self, grouped, progress_callback):
+        os.makedirs(self.output_dir, exist_ok=True)
+        paths, errors = [], []
+        # spawn вместо fork: процесс приложения многопоточный (Tkinter, поток данных)
+        context = multiprocessing.get_context('spawn')
+        queued = iter(grouped.items())
+        in_flight = {}  # future -> symbol
+        done = 0
+        with ProcessPoolExecutor(max_workers=self.max_workers, mp_context=context) as pool:
+            while True:
+                # В пуле не больше двух задач на процесс: при закрытии приложения
+                # новые графики не отправляются, и ждать приходится только уже начатые
+                while not self._cancelled.is_set() and len(in_flight) < 2 * self.max_workers:
+                    item = next(queued, None)
+                    if item is None:
+                        break
+                    symbol, (timestamps, prices) = item
+                    future = pool.submit(render_graph_file, symbol, timestamps, prices,
+                                         self.ui_settings, self.output_dir, self.dpi)
+                    in_flight[future] = symbol
+                if not in_flight:
+                    break
+
+                finished, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    symbol = in_flight.pop(future)
+                    try:
+                        paths.append(future.result())
+                    except Exception as e:
+                        errors.append(f"{symbol}: {e}")
+                    done += 1
+                    if progress_callback:
+                        progress_callback(done, len(grouped))
+        return paths, errors
+
+    def shutdown(self):
+        """
+        Отменяет незавершенный экспорт: ожидающие задачи снимаются с очереди,
+        а массовый экспорт останавливается после графиков, которые уже в пуле.
+        """
+        self._cancelled.set()
+        self._executor.shutdown(wait=False, cancel_futures=True)
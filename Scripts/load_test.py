@@ -0,0 +1,102 @@
+# =============================================================================
+# Модуль: Scripts/load_test.py
+#
+# Описание:
+# Безынтерфейсный нагрузочный тест приложения на имитации биржи.
+# Прогоняет тот же конвейер обработки данных, что и GUI (получение тикеров,
+# обновление истории, поиск аномалий, запись в хранилище), заданное число циклов
+# без пауз и выводит время каждого этапа.
+#
+# Пример запуска (из папки Scripts):
+# python load_test.py --cycles 100 --symbols 5000 --error-rate 0.05
+#
+# =============================================================================
+
+import os
+import sys
+import time
+import argparse
+import tempfile
+
+# --- Добавляем путь к корневой директории проекта, чтобы импорты работали ---
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.append(project_root)
+
+import Scripts.config_manager as cm
+import Scripts.main as app
+import Library.api_handler as api
+
+
+def parse_args():
+    """Разбирает аргументы командной строки."""
+    parser = argparse.ArgumentParser(description="Нагрузочный тест на имитации биржи.")
+    parser.add_argument('--cycles', type=int, default=50, help="Количество циклов обновления.")
+    parser.add_argument('--symbols', type=int, default=None,
+                        help="Количество синтетических символов (по умолчанию из config.ini).")
+    parser.add_argument('--error-rate', type=float, default=None, help="Доля запросов с ошибкой.")
+    parser.add_argument('--latency-ms', type=float, default=None, help="Средняя задержка запроса, мс.")
+    parser.add_argument('--spike-probability', type=float, default=None,
+                        help="Вероятность скачка цены символа на шаге.")
+    parser.add_argument('--config', default=os.path.join(project_root, 'config.ini'),
+                        help="Путь к файлу конфигурации.")
+    return parser.parse_args()
+
+
+def run_load_test(config, cycles):
+    """
+    Прогоняет конвейер обработки данных cycles раз и печатает статистику.
+
+    Args:
+        config (dict): Загруженная конфигурация (exchange будет заменен на simulated).
+        cycles (int): Количество циклов обновления.
+    """
+    config['api']['exchange'] = api.SIMULATED_EXCHANGE_NAME
+    exchange = app.connect_exchange(config)
+    app.app_state['config'] = config
+    app.app_state['exchange'] = exchange
+
+    fetch_times, analysis_times = [], []
+    failed_cycles, anomalies_count = 0, 0
+
+    for cycle in range(cycles):
+        start = time.perf_counter()
+        current_data_df = api.fetch_tickers(exchange, config['api']['symbols'])
+        fetch_times.append(time.perf_counter() - start)
+
+        if current_data_df.empty:
+            failed_cycles += 1
+            continue
+
+        start = time.perf_counter()
+        anomalies_count += len(app.process_market_data(current_data_df))
+        analysis_times.append(time.perf_counter() - start)
+
+    print(f"\nСимволов: {len(config['api']['symbols'])}, циклов: {cycles}, неудачных: {failed_cycles}")
+    if fetch_times:
+        print(f"Получение тикеров: среднее {1000 * sum(fetch_times) / len(fetch_times):.1f} мс, "
+              f"максимум {1000 * max(fetch_times):.1f} мс")
+    if analysis_times:
+        print(f"Анализ и запись в хранилище: среднее {1000 * sum(analysis_times) / len(analysis_times):.1f} мс, "
+              f"максимум {1000 * max(analysis_times):.1f} мс")
+    print(f"Внедрено скачков: {len(exchange.injected_spikes)}, найдено аномалий: {anomalies_count}")
+
+
+if __name__ == '__main__':
+    args = parse_args()
+    loaded_config = cm.load_config(args.config)
+
+    overrides = {
+        'symbols_count': args.symbols,
+        'error_rate': args.error_rate,
+        'latency_ms': args.latency_ms,
+        'spike_probability': args.spike_probability
+    }
+    for key, value in overrides.items():
+        if value is not None:
+            loaded_config['simulation'][key] = value
+
+    # Лог аномалий теста пишем во временную папку, чтобы не засорять рабочий
+    with tempfile.TemporaryDirectory() as temp_dir:
+        loaded_config['logging']['log_file'] = os.path.join(temp_dir, 'anomaly_log.csv')
+        loaded_config['logging']['store_dir'] = os.path.join(temp_dir, 'anomalies')
+        run_load_test(loaded_config, args.cycles)
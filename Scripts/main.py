@@ -10,9 +10,11 @@
 
 import os
 import sys
+import time
+import threading
 import pandas as pd
 from datetime import datetime
-from tkinter import filedialog, messagebox, NORMAL
+from tkinter import filedialog, messagebox, NORMAL, DISABLED
 
 # --- Добавляем путь к корневой директории проекта, чтобы импорты работали ---
 # Это позволяет запускать main.py напрямую из папки Scripts
@@ -23,145 +25,349 @@ sys.path.append(project_root)
 # --- Импорты из нашего проекта ---
 import Scripts.config_manager as cm
 import Scripts.ui_manager as ui
+from Scripts.ui_coordinator import UiUpdateCoordinator
+from Scripts.anomaly_log_view import VirtualAnomalyLog
+from Scripts.graph_export import GraphExporter
 import Library.api_handler as api
-import Library.data_analyzer as analyzer
+import Library.detectors as detectors
+import Library.market_analyzer as market
+import Library.anomaly_store as storage
 
 # --- Глобальные переменные для хранения состояния ---
 # Используем словарь для группировки, чтобы не плодить много глобальных переменных
 app_state = {
     'config': None,
+    'config_watcher': None,  # Отслеживание изменений config.ini
     'exchange': None,
     'root': None,
     'widgets': None,
     'history_df': pd.DataFrame(columns=['timestamp', 'symbol', 'price']),
+    'detector_engine': None,  # Детекторы аномалий по символам (создаются при первом анализе)
+    'market_model': None,  # Модель рыночного фактора для выявления движений всего рынка
+    'anomaly_store': None,  # Сегментированное хранилище найденных аномалий
+    'anomaly_log': None,  # Виртуализированная таблица лога аномалий
+    'ui_coordinator': None,  # Покадровое применение изменений к интерфейсу
+    'graph_exporter': None,  # Фоновый экспорт графиков в файлы
+    'stop_event': threading.Event(),  # Сигнал остановки для потока получения данных
     'selected_symbol_for_graph': None
 }
 
 
-def load_log_file(log_path):
-    """Загружает существующий лог аномалий, если он есть."""
-    if os.path.exists(log_path):
+def open_anomaly_store(config):
+    """
+    Открывает хранилище аномалий. При первом запуске переносит
+    в него аномалии из CSV-лога прежнего формата, если он есть.
+    """
+    store = storage.AnomalyStore(config['logging']['store_dir'], config['logging']['retention_days'])
+    log_path = config['logging']['log_file']
+    if store.count() == 0 and os.path.exists(log_path):
         try:
-            log_df = pd.read_csv(log_path)
-            # Заполняем лог в интерфейсе в обратном порядке для правильного отображения
-            for index, row in log_df.iloc[::-1].iterrows():
-                anomaly_info = {
-                    'symbol': row['symbol'],
-                    'price': row['price'],
-                    'lower_bound': row['lower_bound'],
-                    'upper_bound': row['upper_bound']
-                }
-                # Времени у нас нет, но остальные данные есть
-                desc = f"Цена вышла за пределы нормы ({anomaly_info['lower_bound']} - {anomaly_info['upper_bound']})"
-                values = (row['timestamp'], row['symbol'], f"{row['price']:.4f}", desc)
-                app_state['widgets']['anomaly_tree'].insert("", 0, values=values)
+            imported = store.import_csv(log_path)
+            print(f"Перенесено аномалий из {log_path} в хранилище: {imported}")
         except Exception as e:
-            print(f"Ошибка при загрузке лог-файла {log_path}: {e}")
+            print(f"Ошибка при переносе лог-файла {log_path}: {e}")
+    return store
 
 
-def save_anomaly_to_log(anomaly_info, log_path):
-    """Сохраняет информацию об аномалии в CSV файл."""
-    try:
-        header = not os.path.exists(log_path)
-        log_entry = pd.DataFrame([{
-            'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
-            'symbol': anomaly_info['symbol'],
-            'price': anomaly_info['price'],
-            'mean': anomaly_info['mean'],
-            'deviation': anomaly_info['deviation'],
-            'lower_bound': anomaly_info['lower_bound'],
-            'upper_bound': anomaly_info['upper_bound']
-        }])
-        log_entry.to_csv(log_path, mode='a', header=header, index=False)
-    except Exception as e:
-        print(f"Ошибка при записи в лог-файл {log_path}: {e}")
+# Как часто (мс) поток Tkinter проверяет готовность фонового экспорта
+EXPORT_POLL_INTERVAL_MS = 200
+# Как часто (сек) проверяется, изменился ли config.ini
+CONFIG_POLL_INTERVAL_SECONDS = 1.0
+# Секции, изменения которых вступают в силу только после перезапуска приложения
+RESTART_SECTIONS = ('ui', 'logging', 'simulation')
+
+
+def watch_future(future, callback):
+    """Вызывает callback(future) в потоке Tkinter, когда фоновая задача завершится."""
+    if future.done():
+        callback(future)
+    else:
+        app_state['root'].after(EXPORT_POLL_INTERVAL_MS, watch_future, future, callback)
 
 
 def save_graph_to_file():
     """
     Обработчик нажатия на кнопку сохранения графика.
-    Сохраняет текущий график в файл изображения.
+    Сохраняет график выбранного символа в файл изображения в фоновом потоке.
     """
-    figure_to_save = app_state['widgets']['graph_figure']
-    selected_symbol = app_state.get('selected_symbol_for_graph', 'chart')
+    selected_symbol = app_state.get('selected_symbol_for_graph')
 
     # Если по какой-то причине символ не выбран, ничего не делаем
     if not selected_symbol:
         messagebox.showwarning("Сохранение", "Сначала выберите символ в таблице.")
         return
 
+    future = app_state['graph_exporter'].export_symbol(app_state['history_df'], selected_symbol)
+    app_state['ui_coordinator'].submit_status(f"Сохранение графика {selected_symbol}...")
+    watch_future(future, on_graph_saved)
+
+
+def on_graph_saved(future):
+    """Сообщает пользователю результат сохранения одного графика."""
     try:
-        # Формируем имя файла: SYMBOL_YYYYMMDD_HHMMSS.png
-        filename = f"{selected_symbol.replace('/', '_')}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.png"
+        filepath = future.result()
+        messagebox.showinfo("Сохранение графика", f"График успешно сохранен:\n{filepath}")
+    except Exception as e:
+        messagebox.showerror("Ошибка сохранения", f"Не удалось сохранить график.\nОшибка: {e}")
 
-        graphics_dir = '../Graphics'
-        filepath = os.path.join(graphics_dir, filename)
 
-        # Сохраняем файл
-        figure_to_save.savefig(filepath, dpi=300, bbox_inches='tight')
+def export_all_graphs():
+    """
+    Обработчик нажатия на кнопку экспорта всех графиков.
+    Графики всех отслеживаемых символов рисуются параллельно в пуле процессов,
+    ход экспорта отображается в статус-баре.
+    """
+    coordinator = app_state['ui_coordinator']
+    app_state['widgets']['export_all_button'].config(state=DISABLED)
+    future = app_state['graph_exporter'].export_all(
+        app_state['history_df'], app_state['config']['api']['symbols'],
+        progress_callback=lambda done, total: coordinator.submit_status(f"Экспорт графиков: {done} из {total}")
+    )
+    coordinator.submit_status("Экспорт графиков: подготовка...")
+    watch_future(future, on_all_graphs_exported)
 
-        # Сообщаем пользователю об успехе
-        messagebox.showinfo("Сохранение графика", f"График успешно сохранен:\n{os.path.abspath(filepath)}")
 
+def on_all_graphs_exported(future):
+    """Сообщает пользователю итог экспорта всех графиков."""
+    app_state['widgets']['export_all_button'].config(state=NORMAL)
+    try:
+        paths, errors = future.result()
     except Exception as e:
-        messagebox.showerror("Ошибка сохранения", f"Не удалось сохранить график.\nОшибка: {e}")
+        messagebox.showerror("Ошибка экспорта", f"Не удалось экспортировать графики.\nОшибка: {e}")
+        return
 
+    if not paths and not errors:
+        messagebox.showwarning("Экспорт графиков", "Нет данных для экспорта. Дождитесь получения котировок.")
+        return
+    output_dir = os.path.abspath(app_state['config']['export']['output_dir'])
+    message = f"Сохранено графиков: {len(paths)}\nПапка: {output_dir}"
+    if errors:
+        # Показываем только первые ошибки, чтобы окно оставалось читаемым
+        message += f"\n\nОшибок: {len(errors)}\n" + "\n".join(errors[:5])
+        messagebox.showwarning("Экспорт графиков", message)
+    else:
+        messagebox.showinfo("Экспорт графиков", message)
+
+
+def process_market_data(current_data_df, detected_at=None):
+    """
+    Обрабатывает очередную порцию котировок: обновляет историю,
+    ищет аномалии и сохраняет найденные аномалии в хранилище.
+    Не обращается к виджетам, поэтому используется и в GUI, и в
+    безынтерфейсном нагрузочном тесте (Scripts/load_test.py).
+
+    Args:
+        current_data_df (pd.DataFrame): Свежие котировки ['timestamp', 'symbol', 'price'].
+        detected_at (datetime, optional): Время обнаружения аномалий цикла. По умолчанию - текущее.
+
+    Returns:
+        list: Список словарей с информацией о найденных аномалиях.
+    """
+    config = app_state['config']
+    detected_at = detected_at or datetime.now()
+
+    # 1. Обновляем историю
+    app_state['history_df'] = pd.concat([app_state['history_df'], current_data_df], ignore_index=True)
+    # Ограничиваем размер истории, чтобы не съедать всю память
+    max_history_size = len(config['api']['symbols']) * 1000
+    if len(app_state['history_df']) > max_history_size:
+        app_state['history_df'] = app_state['history_df'].tail(max_history_size)
+
+    # 2. Анализируем данные на аномалии: каждый детектор получает свои символы одним пакетом
+    if app_state['detector_engine'] is None:
+        app_state['detector_engine'] = detectors.DetectorEngine(config['analysis'], config['detectors'])
+    symbols, prices = current_data_df['symbol'].tolist(), current_data_df['price'].tolist()
+    found_anomalies = app_state['detector_engine'].process(symbols, prices)
+
+    # 3. Сворачиваем аномалии, вызванные движением всего рынка, в одно событие
+    if config['market']['enabled']:
+        if app_state['market_model'] is None:
+            app_state['market_model'] = market.MarketFactorModel(config['market'])
+        market_event = app_state['market_model'].update(symbols, prices)
+        found_anomalies = market.split_market_anomalies(market_event, found_anomalies)
+
+    # 4. Сохраняем аномалии в хранилище
+    if app_state['anomaly_store'] is None:
+        app_state['anomaly_store'] = open_anomaly_store(config)
+    try:
+        app_state['anomaly_store'].append_many(found_anomalies, timestamp=detected_at)
+    except Exception as e:
+        print(f"Ошибка при записи в хранилище аномалий {config['logging']['store_dir']}: {e}")
+
+    return found_anomalies
 
-def main_update_cycle():
+
+def uses_all_simulated_symbols(config):
+    """Отслеживаются ли все символы имитации биржи (список symbols из config.ini не используется)."""
+    return config['api']['exchange'] == api.SIMULATED_EXCHANGE_NAME and config['simulation']['symbols_count'] > 0
+
+
+def apply_config(new_config):
     """
-    Основной цикл обновления данных и интерфейса.
-    Вызывается периодически с помощью root.after().
+    Применяет измененную конфигурацию без перезапуска и без потери накопленной истории.
+
+    Новые символы получают собственные буферы при первом анализе, состояние
+    удаленных символов освобождается, а детекторы перестраивают окна и пороги
+    по уже накопленным ценам. Вызывается в потоке данных между циклами.
+
+    Args:
+        new_config (dict): Настройки, прочитанные из измененного config.ini.
+
+    Raises:
+        ValueError: Если изменения нельзя применить (прежняя конфигурация не меняется).
     """
     config = app_state['config']
+
+    # 1. Параметры, которые нельзя сменить на ходу, остаются прежними до перезапуска
+    restart_needed = [section for section in RESTART_SECTIONS if new_config[section] != config[section]]
+    if new_config['api']['exchange'] != config['api']['exchange']:
+        restart_needed.append('api')
+    for section in RESTART_SECTIONS:
+        new_config[section] = config[section]
+    new_config['api']['exchange'] = config['api']['exchange']
+
+    # 2. Проверяем новые символы до изменения состояния
+    if uses_all_simulated_symbols(config):
+        new_config['api']['symbols'] = config['api']['symbols']
+    added = [s for s in new_config['api']['symbols'] if s not in set(config['api']['symbols'])]
+    unknown = api.find_unknown_symbols(app_state['exchange'], added) if added else []
+    if unknown:
+        raise ValueError(f"Символы отсутствуют на бирже: {', '.join(unknown)}")
+
+    # 3. Детекторы: новые окна, пороги и назначения поверх накопленной истории
+    removed = set(config['api']['symbols']) - set(new_config['api']['symbols'])
+    engine = app_state['detector_engine']
+    reassigned = engine.reconfigure(new_config['analysis'], new_config['detectors']) if engine else []
+    if removed:
+        for symbol in removed:
+            if engine:
+                engine.remove_symbol(symbol)
+            if app_state['market_model']:
+                app_state['market_model'].remove_symbol(symbol)
+        app_state['history_df'] = app_state['history_df'][~app_state['history_df']['symbol'].isin(removed)]
+        if app_state['selected_symbol_for_graph'] in removed:
+            app_state['selected_symbol_for_graph'] = None
+    history_df = app_state['history_df']
+    for symbol in reassigned:
+        if symbol not in removed:
+            engine.warm_up(symbol, history_df.loc[history_df['symbol'] == symbol, 'price'].tolist())
+
+    # 4. Модель рынка и экспорт графиков
+    if not new_config['market']['enabled']:
+        app_state['market_model'] = None
+    elif app_state['market_model']:
+        app_state['market_model'].reconfigure(new_config['market'])
+    if app_state['graph_exporter']:
+        app_state['graph_exporter'].reconfigure(new_config['export'])
+
+    app_state['config'] = new_config
+
+    message = "Настройки config.ini применены"
+    if restart_needed:
+        message += f" (секции {', '.join(restart_needed)} - после перезапуска)"
+    print(f"{message}. Добавлено символов: {len(added)}, удалено: {len(removed)}.")
+    coordinator = app_state['ui_coordinator']
+    if coordinator:
+        if added or removed:
+            coordinator.submit_symbols(new_config['api']['symbols'])
+        coordinator.submit_status(message)
+
+
+def check_config_reload():
+    """Проверяет, изменился ли config.ini, и применяет изменения. Ошибочные изменения отклоняются."""
+    try:
+        new_config = app_state['config_watcher'].poll()
+        if new_config is not None:
+            apply_config(new_config)
+    except (FileNotFoundError, KeyError, ValueError) as e:
+        print(f"Изменения config.ini отклонены, действуют прежние настройки. {e}")
+        if app_state['ui_coordinator']:
+            app_state['ui_coordinator'].submit_status("Ошибка в config.ini, действуют прежние настройки.")
+    except Exception as e:
+        # Непредвиденная ошибка не должна завершать поток данных (см. data_worker)
+        print(f"ОШИБКА: Не удалось применить изменения config.ini. {e}")
+        if app_state['ui_coordinator']:
+            app_state['ui_coordinator'].submit_status("Ошибка применения config.ini, подробности в консоли.")
+
+
+def wait_for_next_cycle():
+    """Ждет следующего цикла (или сигнала остановки), периодически проверяя config.ini."""
+    deadline = time.monotonic() + app_state['config']['analysis']['update_interval_seconds']
+    while not app_state['stop_event'].is_set():
+        check_config_reload()
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            break
+        app_state['stop_event'].wait(min(remaining, CONFIG_POLL_INTERVAL_SECONDS))
+
+
+def data_worker():
+    """
+    Цикл получения и анализа данных в фоновом потоке.
+
+    Поток не обращается к виджетам: результаты каждого цикла передаются
+    координатору интерфейса, который отрисовывает их в потоке Tkinter
+    с собственной частотой кадров. Поэтому частый опрос биржи не
+    замедляет реакцию интерфейса. Изменения config.ini применяются
+    здесь же, между циклами, поэтому не пересекаются с анализом.
+    """
     exchange = app_state['exchange']
-    widgets = app_state['widgets']
+    coordinator = app_state['ui_coordinator']
 
-    # 1. Получаем свежие данные с биржи
-    print("Обновление данных...")
-    current_data_df = api.fetch_tickers(exchange, config['api']['symbols'])
+    while not app_state['stop_event'].is_set():
+        try:
+            # 1. Получаем свежие данные с биржи (конфигурация могла измениться между циклами)
+            current_data_df = api.fetch_tickers(exchange, app_state['config']['api']['symbols'])
+
+            if current_data_df.empty:
+                print("Не удалось получить свежие данные. Пропускаем цикл.")
+                coordinator.submit_status("Ошибка обновления! Проверьте интернет или API биржи.")
+            else:
+                # 2. Обновляем историю и ищем аномалии. Время обнаружения берется один раз,
+                # чтобы строки живого лога совпадали с записями хранилища
+                detected_at = datetime.now()
+                found_anomalies = process_market_data(current_data_df, detected_at)
+
+                # 3. Передаем изменения координатору интерфейса
+                selected_symbol = app_state['selected_symbol_for_graph']
+                graph_affected = bool(selected_symbol) and selected_symbol in set(current_data_df['symbol'])
+                coordinator.submit_cycle(current_data_df, found_anomalies, graph_affected, detected_at)
+        except Exception as e:
+            # Одна непредвиденная ошибка не должна останавливать получение данных до конца работы
+            print(f"ОШИБКА: Непредвиденная ошибка в цикле обработки данных, цикл пропущен. {e}")
+            coordinator.submit_status("Ошибка обработки данных! Цикл пропущен, подробности в консоли.")
 
-    if current_data_df.empty:
-        print("Не удалось получить свежие данные. Пропускаем цикл.")
-        widgets['status_label'].config(text="Ошибка обновления! Проверьте интернет или API биржи.")
-    else:
-        # 2. Обновляем историю
-        app_state['history_df'] = pd.concat([app_state['history_df'], current_data_df], ignore_index=True)
-        # Ограничиваем размер истории, чтобы не съедать всю память
-        max_history_size = len(config['api']['symbols']) * 1000
-        if len(app_state['history_df']) > max_history_size:
-            app_state['history_df'] = app_state['history_df'].tail(max_history_size)
-
-        # 3. Анализируем данные на аномалии
-        found_anomalies = []
-        for index, row in current_data_df.iterrows():
-            anomaly = analyzer.find_anomalies(
-                history_df=app_state['history_df'],
-                current_price=row['price'],
-                symbol=row['symbol'],
-                window=config['analysis']['moving_average_window'],
-                threshold=config['analysis']['standard_deviation_threshold']
-            )
-            if anomaly:
-                found_anomalies.append(anomaly)
-                # 4. Обновляем лог в UI и в файле
-                ui.update_anomaly_log(widgets['anomaly_tree'], anomaly)
-                save_anomaly_to_log(anomaly, config['logging']['log_file'])
-
-        # 5. Обновляем интерфейс
-        ui.update_prices_table(widgets['prices_tree'], current_data_df, found_anomalies, config)
-        ui.update_status_bar(widgets['status_label'], datetime.now())
-
-        # Обновляем график, если выбран какой-то символ
-        if app_state['selected_symbol_for_graph']:
-            ui.update_graph(
-                widgets['graph_ax'], widgets['graph_canvas'],
-                app_state['history_df'], app_state['selected_symbol_for_graph'],
-                config
-            )
-
-    # 6. Планируем следующий запуск этого же цикла
-    update_interval_ms = config['analysis']['update_interval_seconds'] * 1000
-    app_state['root'].after(update_interval_ms, main_update_cycle)
+        # 4. Ждем следующего цикла, применяя изменения config.ini
+        wait_for_next_cycle()
+
+
+def redraw_graph():
+    """Перерисовывает график выбранного символа (вызывается в потоке Tkinter)."""
+    ui.update_graph(
+        app_state['widgets']['graph_ax'], app_state['widgets']['graph_canvas'],
+        app_state['history_df'], app_state['selected_symbol_for_graph'], app_state['config']
+    )
+
+
+def on_close():
+    """Останавливает поток данных и закрывает окно."""
+    app_state['stop_event'].set()
+    if app_state['graph_exporter']:
+        app_state['graph_exporter'].shutdown()
+    app_state['root'].destroy()
+
+
+def connect_exchange(config):
+    """
+    Подключается к бирже из конфигурации.
+    Для имитации биржи с синтетическими символами (symbols_count > 0)
+    список отслеживаемых символов расширяется до всех символов имитации.
+    """
+    exchange = api.connect_to_exchange(config['api']['exchange'],
+                                       config['simulation'], config['api']['symbols'])
+    if exchange and uses_all_simulated_symbols(config):
+        config['api']['symbols'] = list(exchange.symbols)
+    return exchange
 
 
 def on_symbol_select(event):
@@ -175,10 +381,7 @@ def on_symbol_select(event):
     app_state['selected_symbol_for_graph'] = selected_symbol
 
     # Сразу обновляем график
-    ui.update_graph(
-        app_state['widgets']['graph_ax'], app_state['widgets']['graph_canvas'],
-        app_state['history_df'], selected_symbol, app_state['config']
-    )
+    redraw_graph()
 
     app_state['widgets']['save_graph_button'].config(state=NORMAL)
 
@@ -190,9 +393,11 @@ def main():
         config_path = os.path.join(project_root, 'config.ini')
         config = cm.load_config(config_path)
         app_state['config'] = config
+        app_state['config_watcher'] = cm.ConfigWatcher(config_path)
+        app_state['detector_engine'] = detectors.DetectorEngine(config['analysis'], config['detectors'])
 
         # 2. Подключаемся к бирже
-        exchange = api.connect_to_exchange(config['api']['exchange'])
+        exchange = connect_exchange(config)
         if not exchange:
             print("Не удалось подключиться к бирже. Приложение будет закрыто.")
             return
@@ -211,13 +416,27 @@ def main():
         widgets['prices_tree'].bind('<<TreeviewSelect>>', on_symbol_select)
         # Обработчик для кнопки Сохранить в файл
         widgets['save_graph_button'].config(command=save_graph_to_file)
-
-        # Загружаем старые аномалии из лога
-        load_log_file(config['logging']['log_file'])
-
-        # 4. Запускаем первый цикл обновления и затем главный цикл Tkinter
+        # Обработчик для кнопки экспорта графиков всех символов
+        widgets['export_all_button'].config(command=export_all_graphs)
+        app_state['graph_exporter'] = GraphExporter(config['export'], config['ui'])
+
+        # Загружаем последние аномалии из хранилища в виртуальный лог
+        app_state['anomaly_store'] = open_anomaly_store(config)
+        anomaly_log = VirtualAnomalyLog(widgets['anomaly_tree'], widgets['anomaly_scrollbar'],
+                                        widgets['anomaly_filter'], app_state['anomaly_store'],
+                                        config['ui']['anomaly_ring_size'])
+        anomaly_log.set_symbols(config['api']['symbols'])
+        anomaly_log.reload()
+        app_state['anomaly_log'] = anomaly_log
+
+        # 4. Запускаем координатор интерфейса, поток данных и главный цикл Tkinter
         print("Запуск приложения...")
-        root.after(1000, main_update_cycle)  # Запускаем первый апдейт через 1 секунду
+        coordinator = UiUpdateCoordinator(root, widgets, anomaly_log, config['ui'], redraw_graph)
+        app_state['ui_coordinator'] = coordinator
+        coordinator.start()
+
+        root.protocol("WM_DELETE_WINDOW", on_close)
+        threading.Thread(target=data_worker, name='data-worker', daemon=True).start()
         root.mainloop()
 
     except (FileNotFoundError, KeyError, ValueError) as e:
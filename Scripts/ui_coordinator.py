@@ -0,0 +1,178 @@
+# =============================================================================
+# Модуль: Scripts/ui_coordinator.py
+#
+# Описание:
+# Координатор обновлений интерфейса. Отделяет частоту отрисовки от частоты
+# поступления данных: поток получения данных только сообщает координатору
+# об изменениях (новые цены, аномалии, устаревший график), а координатор
+# применяет накопленные изменения в потоке Tkinter не чаще max_fps раз
+# в секунду и не дольше frame_budget_ms за кадр.
+#
+# Промежуточные обновления сливаются (по каждому символу отрисовывается только
+# последняя цена), а малоприоритетная работа - перерисовка графика -
+# откладывается до кадра, в котором остался запас времени.
+#
+# =============================================================================
+
+import threading
+import time
+from collections import deque
+from datetime import datetime
+
+import Scripts.ui_manager as ui
+
+
+class UiUpdateCoordinator:
+    """
+    Собирает "грязное" состояние интерфейса и применяет его покадрово.
+
+    Методы submit_* потокобезопасны и вызываются из потока данных;
+    все обращения к виджетам происходят только в _on_frame (поток Tkinter).
+    """
+
+    def __init__(self, root, widgets, anomaly_log, ui_settings, draw_graph):
+        """
+        Args:
+            root (tk.Tk): Главное окно (для планирования кадров через after).
+            widgets (dict): Виджеты из ui_manager.create_widgets.
+            anomaly_log (VirtualAnomalyLog): Виртуализированная таблица лога аномалий.
+            ui_settings (dict): Секция 'ui' конфигурации (max_fps, frame_budget_ms, ...).
+            draw_graph (callable): Функция без аргументов, перерисовывающая график.
+        """
+        self.root = root
+        self.widgets = widgets
+        self.anomaly_log = anomaly_log
+        self.draw_graph = draw_graph
+        self.frame_interval_ms = max(1, int(1000 / ui_settings['max_fps']))
+        self.frame_budget = ui_settings['frame_budget_ms'] / 1000
+        self.graph_min_interval = ui_settings['graph_min_interval_ms'] / 1000
+
+        self._lock = threading.Lock()
+        self._dirty_prices = {}  # symbol -> (price, status, tag), только последние значения
+        self._pending_anomalies = deque(maxlen=ui_settings['max_pending_anomalies'])
+        self._anomalies_dropped = False
+        self._graph_dirty = False
+        self._status = None  # datetime последнего обновления или строка сообщения
+        self._symbols = None  # новый список символов после перезагрузки config.ini
+        self._last_graph_draw = 0.0
+
+    # --- Вызовы из потока данных ---
+
+    def submit_cycle(self, data_df, anomalies, graph_affected, detected_at=None):
+        """
+        Регистрирует результаты цикла обработки данных.
+
+        Args:
+            data_df (pd.DataFrame): Свежие котировки.
+            anomalies (list): Найденные за цикл аномалии.
+            graph_affected (bool): Изменились ли данные символа, показанного на графике.
+            detected_at (datetime, optional): Время обнаружения аномалий (то же, что записано
+                                              в хранилище). По умолчанию - текущее.
+        """
+        rows = ui.price_statuses(data_df, anomalies)
+        detected_at = detected_at or datetime.now()
+        with self._lock:
+            for symbol, price, status, tag in rows:
+                self._dirty_prices[symbol] = (price, status, tag)
+            # При переполнении очереди самые старые аномалии отбрасываются;
+            # они уже сохранены в хранилище, и лог будет перечитан из него
+            if len(self._pending_anomalies) + len(anomalies) > self._pending_anomalies.maxlen:
+                self._anomalies_dropped = True
+            self._pending_anomalies.extend((detected_at, a) for a in anomalies)
+            self._graph_dirty = self._graph_dirty or graph_affected
+            self._status = detected_at
+
+    def submit_status(self, message):
+        """Регистрирует сообщение для статус-бара (ошибка получения данных, ход экспорта)."""
+        with self._lock:
+            self._status = message
+
+    def submit_symbols(self, symbols):
+        """Регистрирует новый список отслеживаемых символов (после перезагрузки конфигурации)."""
+        tracked = set(symbols)
+        with self._lock:
+            self._symbols = list(symbols)
+            # Неотрисованные цены удаленных символов не должны вернуть их строки в таблицу
+            self._dirty_prices = {s: row for s, row in self._dirty_prices.items() if s in tracked}
+            self._graph_dirty = True
+
+    # --- Покадровое применение изменений (поток Tkinter) ---
+
+    def start(self):
+        """Запускает покадровый цикл."""
+        self.root.after(self.frame_interval_ms, self._on_frame)
+
+    def _take_prices(self):
+        with self._lock:
+            prices, self._dirty_prices = self._dirty_prices, {}
+        return prices
+
+    def _take_anomalies(self):
+        with self._lock:
+            anomalies = list(self._pending_anomalies)
+            self._pending_anomalies.clear()
+            dropped, self._anomalies_dropped = self._anomalies_dropped, False
+        return anomalies, dropped
+
+    def _apply_symbols(self, symbols):
+        """Убирает из таблицы цен строки символов, которые больше не отслеживаются."""
+        tree = self.widgets['prices_tree']
+        tracked = set(symbols)
+        for item in tree.get_children():
+            if item not in tracked:
+                tree.delete(item)
+        self.anomaly_log.set_symbols(symbols)
+
+    def _on_frame(self):
+        frame_start = time.perf_counter()
+        try:
+            self._apply_frame(frame_start + self.frame_budget)
+        except Exception as e:
+            # Ошибка одного кадра не должна останавливать обновление интерфейса:
+            # несброшенные изменения будут применены в следующих кадрах
+            print(f"ОШИБКА: Непредвиденная ошибка при обновлении интерфейса. {e}")
+            self.widgets['status_label'].config(text="Ошибка обновления интерфейса! Подробности в консоли.")
+        finally:
+            elapsed_ms = int(1000 * (time.perf_counter() - frame_start))
+            self.root.after(max(1, self.frame_interval_ms - elapsed_ms), self._on_frame)
+
+    def _apply_frame(self, deadline):
+        """Применяет накопленные изменения, укладываясь по возможности в бюджет кадра."""
+
+        with self._lock:
+            status, self._status = self._status, None
+            symbols, self._symbols = self._symbols, None
+        if symbols is not None:
+            self._apply_symbols(symbols)
+        if isinstance(status, datetime):
+            ui.update_status_bar(self.widgets['status_label'], status)
+        elif status:
+            self.widgets['status_label'].config(text=status)
+
+        # 1. Таблица цен: только изменившиеся строки; не успевшие - в следующий кадр
+        prices = self._take_prices()
+        remaining = iter(prices.items())
+        for symbol, (price, status_text, tag) in remaining:
+            ui.update_price_row(self.widgets['prices_tree'], symbol, price, status_text, tag)
+            if time.perf_counter() >= deadline:
+                with self._lock:
+                    for later_symbol, later_row in remaining:
+                        self._dirty_prices.setdefault(later_symbol, later_row)
+                break
+
+        # 2. Лог аномалий: виртуальная таблица перерисовывает только видимые строки,
+        # поэтому все накопившиеся аномалии добавляются за одну перерисовку
+        anomalies, dropped = self._take_anomalies()
+        if dropped:
+            self.anomaly_log.reload()
+        else:
+            self.anomaly_log.add_many(anomalies)
+
+        # 3. График - низкий приоритет: только при запасе времени и не чаще graph_min_interval
+        now = time.perf_counter()
+        if now < deadline and now - self._last_graph_draw >= self.graph_min_interval:
+            with self._lock:
+                graph_dirty, self._graph_dirty = self._graph_dirty, False
+            if graph_dirty:
+                self.draw_graph()
+                self._last_graph_draw = time.perf_counter()
@@ -8,12 +8,23 @@
 #
 # =============================================================================
 
+import os
+import sys
 import tkinter as tk
+import pandas as pd
 from tkinter import ttk, font
 from matplotlib.figure import Figure
 from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
 from datetime import datetime
 
+# --- Добавляем путь к корневой директории проекта, чтобы импорты работали ---
+# Это позволяет запускать модуль напрямую (python ui_manager.py из папки Scripts)
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.append(project_root)
+
+from Library.market_analyzer import MARKET_SYMBOL
+from Scripts.graph_export import style_axes, draw_price_history
+
 
 # --- Функции для создания элементов GUI ---
 
@@ -93,6 +104,9 @@ def create_widgets(frames, config):
     widgets['prices_tree'].column('Символ', width=150)
     widgets['prices_tree'].column('Цена', width=150, anchor=tk.E)
     widgets['prices_tree'].column('Статус', width=400, anchor=tk.W)
+    widgets['prices_tree'].tag_configure('anomaly', background=config['ui']['anomaly_color'], foreground='white')
+    widgets['prices_tree'].tag_configure('normal', background=config['ui']['background_color'],
+                                         foreground=config['ui']['text_color'])
     widgets['prices_tree'].pack(fill=tk.X, pady=5)
 
     # --- Виджеты для фрейма с графиком ---
@@ -107,15 +121,12 @@ def create_widgets(frames, config):
     widgets['save_graph_button'].config(state=tk.DISABLED)
     widgets['save_graph_button'].pack(side=tk.RIGHT)
 
+    widgets['export_all_button'] = ttk.Button(graph_header_frame, text="Экспортировать все")
+    widgets['export_all_button'].pack(side=tk.RIGHT, padx=(0, 5))
+
     fig = Figure(figsize=(5, 3), dpi=100, facecolor=config['ui']['background_color'])
     ax = fig.add_subplot(111)
-    ax.set_facecolor(config['ui']['background_color'])
-    ax.tick_params(axis='x', colors=config['ui']['text_color'])
-    ax.tick_params(axis='y', colors=config['ui']['text_color'])
-    ax.spines['top'].set_visible(False)
-    ax.spines['right'].set_visible(False)
-    ax.spines['left'].set_color(config['ui']['text_color'])
-    ax.spines['bottom'].set_color(config['ui']['text_color'])
+    style_axes(ax, config['ui'])
 
     widgets['graph_figure'] = fig
     widgets['graph_ax'] = ax
@@ -123,18 +134,34 @@ def create_widgets(frames, config):
     widgets['graph_canvas'].get_tk_widget().pack(fill=tk.BOTH, expand=True)
 
     # --- Виджеты для лога аномалий ---
-    widgets['anomaly_label'] = ttk.Label(frames['anomaly_frame'], text="Лог аномалий", font=(config['ui']['font_family'], 12, 'bold'))
-    widgets['anomaly_label'].pack(anchor=tk.W) # Просто размещаем слева
+    anomaly_header_frame = ttk.Frame(frames['anomaly_frame'])
+    anomaly_header_frame.pack(fill=tk.X)
+
+    widgets['anomaly_label'] = ttk.Label(anomaly_header_frame, text="Лог аномалий", font=(config['ui']['font_family'], 12, 'bold'))
+    widgets['anomaly_label'].pack(side=tk.LEFT) # Просто размещаем слева
+
+    # Фильтр лога по символу
+    widgets['anomaly_filter'] = ttk.Combobox(anomaly_header_frame, state='readonly', width=20)
+    widgets['anomaly_filter'].pack(side=tk.RIGHT)
+
+    anomaly_body_frame = ttk.Frame(frames['anomaly_frame'])
+    anomaly_body_frame.pack(fill=tk.X, pady=5)
 
     anomaly_cols = ('Время', 'Символ', 'Цена', 'Описание')
-    widgets['anomaly_tree'] = ttk.Treeview(frames['anomaly_frame'], columns=anomaly_cols, show='headings', height=4)
+    widgets['anomaly_tree'] = ttk.Treeview(anomaly_body_frame, columns=anomaly_cols, show='headings',
+                                           height=config['ui']['anomaly_log_rows'])
     for col in anomaly_cols:
         widgets['anomaly_tree'].heading(col, text=col)
     widgets['anomaly_tree'].column('Время', width=150)
     widgets['anomaly_tree'].column('Символ', width=120)
     widgets['anomaly_tree'].column('Цена', width=120, anchor=tk.E)
     widgets['anomaly_tree'].column('Описание', width=410)
-    widgets['anomaly_tree'].pack(fill=tk.X, pady=5)
+    widgets['anomaly_tree'].pack(side=tk.LEFT, fill=tk.X, expand=True)
+
+    # Полоса прокрутки управляется виртуальным логом (Scripts/anomaly_log_view.py),
+    # так как в таблице хранятся только видимые строки
+    widgets['anomaly_scrollbar'] = ttk.Scrollbar(anomaly_body_frame, orient=tk.VERTICAL)
+    widgets['anomaly_scrollbar'].pack(side=tk.RIGHT, fill=tk.Y)
 
     # --- Виджеты для статус-бара ---
     widgets['status_label'] = ttk.Label(frames['status_frame'], text="Инициализация...", style="Status.TLabel")
@@ -145,39 +172,74 @@ def create_widgets(frames, config):
 
 # --- Функции для обновления GUI ---
 
-def update_prices_table(tree, data_df, anomalies, config):
-    """Обновляет таблицу с текущими ценами, подсвечивая аномалии."""
-    tree.delete(*tree.get_children())  # Очищаем старые записи
-
-    anomaly_symbols = [a['symbol'] for a in anomalies]
+def price_statuses(data_df, anomalies):
+    """
+    Определяет статус каждого символа в таблице цен.
 
-    for index, row in data_df.iterrows():
-        symbol = row['symbol']
-        price = f"{row['price']:.4f}"
+    Returns:
+        list: Кортежи (symbol, price, status, tag) в порядке строк data_df.
+    """
+    anomaly_symbols = {a['symbol'] for a in anomalies}
+    market_move = any(a.get('market_move') for a in anomalies)
 
+    rows = []
+    for symbol, price in zip(data_df['symbol'], data_df['price']):
         if symbol in anomaly_symbols:
-            status = "!!! АНОМАЛИЯ !!!"
-            tag = 'anomaly'
+            rows.append((symbol, price, "!!! АНОМАЛИЯ !!!", 'anomaly'))
+        elif market_move:
+            rows.append((symbol, price, "Движение всего рынка", 'normal'))
         else:
-            status = "В норме"
-            tag = 'normal'
+            rows.append((symbol, price, "В норме", 'normal'))
+    return rows
 
-        tree.insert("", tk.END, values=(symbol, price, status), tags=(tag,))
+
+def update_price_row(tree, symbol, price, status, tag):
+    """Обновляет (или добавляет) строку символа в таблице цен, не трогая остальные строки."""
+    values = (symbol, f"{price:.4f}", status)
+    if tree.exists(symbol):
+        tree.item(symbol, values=values, tags=(tag,))
+    else:
+        tree.insert("", tk.END, iid=symbol, values=values, tags=(tag,))
+
+
+def update_prices_table(tree, data_df, anomalies, config):
+    """Обновляет таблицу с текущими ценами, подсвечивая аномалии."""
+    for symbol, price, status, tag in price_statuses(data_df, anomalies):
+        update_price_row(tree, symbol, price, status, tag)
 
     tree.tag_configure('anomaly', background=config['ui']['anomaly_color'], foreground='white')
     tree.tag_configure('normal', background=config['ui']['background_color'], foreground=config['ui']['text_color'])
 
 
-def update_anomaly_log(tree, anomaly_info):
-    """Добавляет новую запись об аномалии в таблицу лога."""
-    desc = f"Цена вышла за пределы нормы ({anomaly_info['lower_bound']} - {anomaly_info['upper_bound']})"
-    values = (
-        datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
-        anomaly_info['symbol'],
-        f"{anomaly_info['price']:.4f}",
-        desc
-    )
-    tree.insert("", 0, values=values)  # Вставляем в начало
+def format_anomaly_row(anomaly_info, timestamp=None):
+    """
+    Формирует значения строки таблицы лога для аномалии.
+
+    Args:
+        anomaly_info (dict): Аномалия из детектора или строка хранилища аномалий.
+        timestamp (datetime or str, optional): Время обнаружения. По умолчанию - текущее.
+
+    Returns:
+        tuple: (Время, Символ, Цена, Описание).
+    """
+    if anomaly_info['symbol'] == MARKET_SYMBOL:
+        desc = f"Движение всего рынка: {anomaly_info['price']:+.2f}%"
+        if pd.notna(anomaly_info.get('breadth')):
+            desc += f" (охват {anomaly_info['breadth']:.0%})"
+        desc += f", норма {anomaly_info['lower_bound']} - {anomaly_info['upper_bound']}%"
+    else:
+        desc = f"Цена вышла за пределы нормы ({anomaly_info['lower_bound']} - {anomaly_info['upper_bound']})"
+    windows = anomaly_info.get('windows')
+    if isinstance(windows, (list, str)) and windows:
+        # В хранилище окна записаны строкой '5,20', у свежих аномалий - списком
+        if isinstance(windows, str):
+            windows = windows.split(',')
+        desc += f", окна: {', '.join(str(w) for w in windows)}"
+
+    timestamp = timestamp or datetime.now()
+    if not isinstance(timestamp, str):
+        timestamp = timestamp.strftime('%Y-%m-%d %H:%M:%S')
+    return (timestamp, anomaly_info['symbol'], f"{anomaly_info['price']:.4f}", desc)
 
 
 def update_graph(ax, canvas, history_df, selected_symbol, config):
@@ -187,13 +249,8 @@ def update_graph(ax, canvas, history_df, selected_symbol, config):
     if selected_symbol and not history_df.empty:
         symbol_data = history_df[history_df['symbol'] == selected_symbol]
         if not symbol_data.empty:
-            ax.plot(symbol_data['timestamp'], symbol_data['price'],
-                    color=config['ui']['graph_line_color'], marker='.', linestyle='-')
-            ax.set_title(f"История цен для {selected_symbol}", color=config['ui']['text_color'])
-            ax.set_ylabel("Цена (USDT)", color=config['ui']['text_color'])
-            # Автоформатирование дат на оси X
-            fig = ax.get_figure()
-            fig.autofmt_xdate()
+            draw_price_history(ax, symbol_data['timestamp'], symbol_data['price'],
+                               selected_symbol, config['ui'])
     else:
         ax.set_title("Выберите символ в таблице для отображения графика", color=config['ui']['text_color'])
 
@@ -216,7 +273,8 @@ if __name__ == '__main__':
         'ui': {
             'background_color': '#f0f0f0', 'text_color': '#000000',
             'success_color': '#2a9d8f', 'anomaly_color': '#e76f51',
-            'graph_line_color': '#0077b6', 'font_family': 'Calibri', 'font_size': 10
+            'graph_line_color': '#0077b6', 'font_family': 'Calibri', 'font_size': 10,
+            'anomaly_log_rows': 4
         }
     }
 
@@ -243,6 +301,6 @@ if __name__ == '__main__':
     test_anomaly = {
         'symbol': 'XRP/USDT', 'price': 1.5, 'lower_bound': 0.4, 'upper_bound': 0.6
     }
-    update_anomaly_log(widgets['anomaly_tree'], test_anomaly)
+    widgets['anomaly_tree'].insert("", 0, values=format_anomaly_row(test_anomaly))
 
     root.mainloop()